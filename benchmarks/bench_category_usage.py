@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Category Usage Analysis Benchmark
+
+Compares the per-transaction defaultdict loop formerly used by
+cleanup_categories.analyze_category_usage (counts and category details only)
+with building a TransactionTable and computing its per-category stats
+(NumPy when installed, a plain loop otherwise). Build and stats are also
+shown separately, since the build happens while paging.
+
+Usage:
+    python benchmarks/bench_category_usage.py [--sizes 100000,1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transaction_table
+from records import Category, Transaction
+from transaction_table import TransactionTable
+
+BASE_ID = 300_000_000
+BASE_ORDINAL = date(2025, 1, 1).toordinal()
+
+
+def make_transactions(size, category_count=63):
+    categories = [Category.intern(1000 + i, f"Category {i}", False) for i in range(category_count)]
+    return [
+        Transaction(BASE_ID + i, f"Merchant {i % 997}", -((i * 37) % 50000) / 100,
+                    date.fromordinal(BASE_ORDINAL - i // 40).isoformat(),
+                    categories[i % category_count] if i % 17 else None)
+        for i in range(size)
+    ]
+
+
+def loop_counts(transactions):
+    """The pre-table counting loop from analyze_category_usage"""
+    counts = defaultdict(int)
+    details = {}
+    for transaction in transactions:
+        category = transaction.category
+        if category:
+            category_id = category.id
+            if category_id:
+                counts[category_id] += 1
+                if category_id not in details:
+                    details[category_id] = category
+    return counts
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark category usage analysis')
+    parser.add_argument('--sizes', default="100000,1000000", help='Comma-separated transaction counts')
+    args = parser.parse_args()
+
+    backend = "numpy" if transaction_table.np is not None else "array/loop"
+    print(f"TransactionTable backend: {backend}")
+    print(f"{'rows':>10} {'dict loop':>11} {'build+stats':>12} {'build':>10} {'stats':>10} {'table size':>11}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        transactions = make_transactions(size)
+        expected, loop_time = timed(loop_counts, transactions)
+        table, build_time = timed(TransactionTable.from_transactions, transactions)
+        stats, stats_time = timed(table.category_stats)
+        assert {category_id: entry["count"] for category_id, entry in stats.items()} == dict(expected)
+
+        column_bytes = sum(column.itemsize * len(column) for column in (
+            table.category_ids, table.amounts, table.dates))
+        print(f"{size:>10,} {loop_time * 1000:>9.1f}ms {(build_time + stats_time) * 1000:>10.1f}ms "
+              f"{build_time * 1000:>8.1f}ms {stats_time * 1000:>8.2f}ms {column_bytes / 1e6:>9.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Transaction Page Parse Allocation Benchmark
+
+Compares `response.json()` (body bytes + decoded text + full nested dicts)
+with the streaming reader in transaction_stream.py on synthetic pages of
+realistic API transactions, measuring with tracemalloc:
+- peak: highest traced allocation while parsing the page
+- retained: memory still held by the parsed page afterwards
+
+Usage:
+    python benchmarks/bench_page_parse.py [--per-page 100,1000,5000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_pocketsmith import FakePocketsmith
+from records import Transaction
+from transaction_stream import STREAM_CHUNK_SIZE, read_transactions_page
+
+
+class BodyResponse:
+    """Just enough of requests.Response to feed both parsers from a byte body"""
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        # requests keeps .content and decodes it to .text before json.loads
+        text = self.body.decode('utf-8')
+        return json.loads(text)
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def measure(parse, body):
+    """Return (result, seconds, peak bytes, retained bytes) for parse(response)"""
+    response = BodyResponse(body)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = parse(response)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak - baseline, current - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark transaction page parsing memory')
+    parser.add_argument('--per-page', default="100,1000,5000", help='Comma-separated page sizes')
+    args = parser.parse_args()
+
+    api = FakePocketsmith(0)
+    print(f"{'per_page':>9} {'body':>9} | {'json() peak':>12} {'retained':>10} {'time':>8} | "
+          f"{'stream peak':>12} {'retained':>10} {'time':>8}")
+    for per_page in [int(value) for value in args.per_page.split(",")]:
+        body = json.dumps([api.render_transaction(index) for index in range(per_page)]).encode()
+
+        full, full_time, full_peak, full_retained = measure(BodyResponse.json, body)
+        slim, slim_time, slim_peak, slim_retained = measure(
+            lambda response: read_transactions_page(response, STREAM_CHUNK_SIZE), body)
+        assert slim == [Transaction.from_api(transaction) for transaction in full]
+
+        print(f"{per_page:>9,} {len(body) / 1e6:>7.2f}MB | {full_peak / 1e6:>10.2f}MB "
+              f"{full_retained / 1e6:>8.2f}MB {full_time * 1000:>6.1f}ms | {slim_peak / 1e6:>10.2f}MB "
+              f"{slim_retained / 1e6:>8.2f}MB {slim_time * 1000:>6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Payee Rule Benchmark
+
+Times the compiled payee rule matcher (payee_rules.RuleMatcher) against a
+naive scan that tries each rule's pattern in turn, as the rule set grows.
+The compiled matcher's cost per transaction should stay flat with the
+number of rules; the scan grows linearly. Both are timed over the same
+transactions, cold (every payee distinct, so nothing is memoised) and warm
+(payees repeating, as in real transaction histories).
+
+Usage:
+    python benchmarks/bench_payee_rules.py [--size 100000] [--rules 10,100,1000,5000]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from category_mapping import get_new_category_names
+from payee_rules import compile_rules, normalize_payee
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "pa", "qu", "de")
+
+
+def make_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_rules(count, rng):
+    """count rules of one to three word phrases, a fifth with an amount bound"""
+    categories = get_new_category_names()
+    definitions = []
+    for i in range(count):
+        definition = {"payee": " ".join(make_word(rng) for _ in range(rng.randint(1, 3))),
+                      "category": categories[i % len(categories)]}
+        if i % 5 == 0:
+            definition["max_amount"] = 0
+        definitions.append(definition)
+    return definitions
+
+
+def make_payees(count, definitions, rng):
+    """Card-statement style payees, about a third containing a rule phrase"""
+    payees = []
+    for i in range(count):
+        words = [make_word(rng) for _ in range(rng.randint(2, 4))]
+        if i % 3 == 0:
+            words.insert(rng.randint(0, len(words)), rng.choice(definitions)["payee"])
+        payees.append(f"{' '.join(words).upper()} {rng.randint(1000, 9999)} SYDNEY")
+    return payees
+
+
+def naive_match(compiled, payee, amount):
+    """First rule whose pattern matches, trying every rule"""
+    text = normalize_payee(payee)
+    for index, (pattern, rule) in enumerate(compiled):
+        if pattern.search(text):
+            if rule.min_amount is not None and amount < rule.min_amount:
+                continue
+            if rule.max_amount is not None and amount > rule.max_amount:
+                continue
+            return index
+    return None
+
+
+def timed(function, transactions):
+    start = time.perf_counter()
+    results = [function(payee, amount) for payee, amount in transactions]
+    return results, (time.perf_counter() - start) * 1e9 / len(transactions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark payee rule matching')
+    parser.add_argument('--size', type=int, default=100_000, help='Transactions to match (default: 100000)')
+    parser.add_argument('--rules', default="10,100,1000,5000", help='Comma-separated rule counts')
+    args = parser.parse_args()
+
+    print(f"{args.size:,} transactions (ns/txn)")
+    print(f"  {'rules':>6}  {'compiled cold':>13}  {'compiled warm':>13}  {'naive scan':>10}")
+    for rule_count in map(int, args.rules.split(',')):
+        rng = random.Random(rule_count)
+        definitions = make_rules(rule_count, rng)
+        payees = make_payees(args.size, definitions, rng)
+        transactions = [(payee, rng.choice((-42.5, 12.0))) for payee in payees]
+        # Warm: the same volume drawn from a few hundred distinct payees
+        repeated = [transactions[rng.randrange(500)] for _ in range(args.size)]
+
+        cold_matcher = compile_rules(definitions)
+        cold, cold_time = timed(cold_matcher.match, transactions)
+        warm_matcher = compile_rules(definitions)
+        _, warm_time = timed(warm_matcher.match, repeated)
+
+        compiled = [(re.compile(r"\b" + re.escape(normalize_payee(definition["payee"])) + r"\b"), rule)
+                    for definition, rule in zip(definitions, cold_matcher.rules)]
+        # The scan is slow at large rule counts; time it on a sample
+        sample = transactions[:max(1, min(args.size, 2_000_000 // rule_count))]
+        naive, naive_time = timed(lambda payee, amount: naive_match(compiled, payee, amount), sample)
+        assert naive == cold[:len(sample)]
+
+        print(f"  {rule_count:>6}  {cold_time:>13.0f}  {warm_time:>13.0f}  {naive_time:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
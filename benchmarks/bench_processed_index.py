@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Processed-ID Index Microbenchmark
+
+Compares the legacy processed-transaction bookkeeping (a list plus a set
+cached on a function attribute that every insert invalidates) with
+ProcessedIndex, at 100k and 1M existing IDs in the 300M range.
+
+Each round performs one membership check followed by one insert, which is
+what process_transaction does per transaction.
+
+Usage:
+    python benchmarks/bench_processed_index.py [--rounds N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpoint_store import ProcessedIndex
+
+BASE_ID = 300_000_000
+
+
+def legacy_is_processed(transaction_id, processed_transactions):
+    """The pre-index lookup from recategorise.py"""
+    if len(processed_transactions) > 100:
+        if not hasattr(legacy_is_processed, '_processed_set'):
+            legacy_is_processed._processed_set = set(processed_transactions)
+        return transaction_id in legacy_is_processed._processed_set
+    return transaction_id in processed_transactions
+
+
+def run_legacy(existing, new_ids):
+    processed = list(existing)
+    start = time.perf_counter()
+    for transaction_id in new_ids:
+        if not legacy_is_processed(transaction_id, processed):
+            processed.append(transaction_id)
+            if hasattr(legacy_is_processed, '_processed_set'):
+                delattr(legacy_is_processed, '_processed_set')
+    return time.perf_counter() - start
+
+
+def run_index(existing, new_ids):
+    processed = ProcessedIndex(existing)
+    start = time.perf_counter()
+    for transaction_id in new_ids:
+        if transaction_id not in processed:
+            processed.add(transaction_id)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark processed-ID bookkeeping')
+    parser.add_argument('--rounds', type=int, default=200, help='Check+insert rounds per size (default: 200)')
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"{'ids':>10} {'legacy/op':>12} {'index/op':>12} {'speedup':>10} {'snapshot':>12}")
+    for size in (100_000, 1_000_000):
+        existing = random.sample(range(BASE_ID, BASE_ID + size * 3), size)
+        new_ids = [BASE_ID + size * 3 + i for i in range(args.rounds)]
+
+        legacy = run_legacy(existing, new_ids) / args.rounds
+        index = run_index(existing, new_ids) / args.rounds
+        snapshot_bytes = len(ProcessedIndex(existing).to_bytes())
+        print(f"{size:>10,} {legacy * 1e6:>10.1f}us {index * 1e6:>10.3f}us "
+              f"{legacy / index:>9.0f}x {snapshot_bytes / 1e6:>10.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
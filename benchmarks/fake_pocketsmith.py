@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Local PocketSmith API Stand-in
+
+A small threaded HTTP server implementing the parts of the PocketSmith v2 API
+the scripts use, for benchmarking without touching the live account:
+- GET /users/{id}/transactions (page, per_page, updated_since) with Link headers
+- PUT /transactions/{id}
+- GET/POST /users/{id}/categories and DELETE /categories/{id}
+
+Transactions are synthesised deterministically from their index, so a million
+of them cost almost no memory; only updated transactions are stored. Latency
+and 429 throttling can be injected to exercise the rate limiter.
+
+Usage:
+    python benchmarks/fake_pocketsmith.py --transactions 100000 [--port 8765]
+                                          [--latency-ms 20] [--throttle-rate 0.01]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from category_mapping import CATEGORY_MAPPING
+
+BASE_TRANSACTION_ID = 300_000_000
+BASE_UPDATED_AT = "2025-01-01T00:00:00Z"
+BASE_DATE_ORDINAL = date(2025, 1, 1).toordinal()
+UNCATEGORIZED_EVERY = 17
+
+
+def load_category_titles():
+    """Titles for the original categories, from categories.json when present"""
+    try:
+        with open(os.path.join(ROOT_DIR, "categories.json")) as f:
+            return {c['id']: c['title'] for c in json.load(f)}
+    except (OSError, ValueError):
+        return {}
+
+
+class FakePocketsmith:
+    """In-memory state behind the fake API"""
+
+    def __init__(self, transaction_count, latency=0.0, throttle_rate=0.0, retry_after=0.05, seed=0):
+        self.transaction_count = transaction_count
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+        titles = load_category_titles()
+        self.old_category_ids = sorted(CATEGORY_MAPPING)
+        self.categories = {
+            category_id: {"id": category_id, "title": titles.get(category_id, f"Category {category_id}"),
+                          "is_transfer": False, "parent_id": None, "updated_at": BASE_UPDATED_AT}
+            for category_id in self.old_category_ids
+        }
+        self.next_category_id = 90_000_000
+        self.categories_version = 0  # bumped on every category change, served as the ETag
+        self.updates = {}  # transaction id -> (category_id, labels, updated_at)
+        self.request_count = 0
+        self.throttled_count = 0
+
+    # Transactions
+
+    def base_transaction(self, index):
+        transaction_id = BASE_TRANSACTION_ID + index
+        category_id = None
+        if index % UNCATEGORIZED_EVERY:
+            category_id = self.old_category_ids[index % len(self.old_category_ids)]
+        return transaction_id, category_id, [], BASE_UPDATED_AT
+
+    def current_category_id(self, index):
+        transaction_id, category_id, _, _ = self.base_transaction(index)
+        with self.lock:
+            if transaction_id in self.updates:
+                category_id = self.updates[transaction_id][0]
+        return category_id
+
+    def render_transaction(self, index):
+        transaction_id, category_id, labels, updated_at = self.base_transaction(index)
+        if transaction_id in self.updates:
+            category_id, labels, updated_at = self.updates[transaction_id]
+        category = self.categories.get(category_id)
+        return {
+            "id": transaction_id,
+            "payee": f"Merchant {index % 997} Pty Ltd",
+            "original_payee": f"MERCHANT {index % 997} SYDNEY AU",
+            "date": date.fromordinal(BASE_DATE_ORDINAL - index // 40).isoformat(),
+            "upload_source": "data_feed",
+            "category": dict(category, children=[], colour="#2196F3", is_bill=False) if category else None,
+            "closing_balance": 1000.0,
+            "cheque_number": None,
+            "memo": None,
+            "amount": -round((index * 37) % 50000 / 100, 2),
+            "amount_in_base_currency": -round((index * 37) % 50000 / 100, 2),
+            "type": "debit",
+            "is_transfer": False,
+            "needs_review": False,
+            "status": "posted",
+            "note": None,
+            "labels": labels,
+            "transaction_account": {"id": 1000 + index % 5, "name": "Everyday", "currency_code": "aud",
+                                    "type": "bank", "current_balance": 1000.0},
+            "created_at": BASE_UPDATED_AT,
+            "updated_at": updated_at,
+        }
+
+    def list_transactions(self, page, per_page, updated_since=None, category_id=None):
+        """Return (transactions, last_page)"""
+        if category_id is not None:
+            indices = [index for index in range(self.transaction_count)
+                       if self.current_category_id(index) == category_id]
+        elif updated_since and updated_since >= BASE_UPDATED_AT:
+            with self.lock:
+                changed = sorted(
+                    (tid for tid, (_, _, updated_at) in self.updates.items() if updated_at >= updated_since),
+                    reverse=True,
+                )
+            indices = [tid - BASE_TRANSACTION_ID for tid in changed]
+        else:
+            indices = range(self.transaction_count)
+        last_page = max(1, -(-len(indices) // per_page))
+        selected = indices[(page - 1) * per_page:page * per_page]
+        return [self.render_transaction(index) for index in selected], last_page
+
+    def update_transaction(self, transaction_id, data):
+        index = transaction_id - BASE_TRANSACTION_ID
+        if not 0 <= index < self.transaction_count:
+            return None
+        with self.lock:
+            _, category_id, labels, _ = self.base_transaction(index)
+            if transaction_id in self.updates:
+                category_id, labels, _ = self.updates[transaction_id]
+            category_id = data.get("category_id", category_id)
+            labels = data.get("labels", labels)
+            self.updates[transaction_id] = (category_id, labels, now_iso())
+        return self.render_transaction(index)
+
+    # Categories
+
+    def create_category(self, title):
+        with self.lock:
+            category_id = self.next_category_id
+            self.next_category_id += 1
+            category = {"id": category_id, "title": title, "is_transfer": False, "parent_id": None,
+                        "updated_at": now_iso()}
+            self.categories[category_id] = category
+            self.categories_version += 1
+        return category
+
+    def delete_category(self, category_id):
+        with self.lock:
+            if self.categories.pop(category_id, None) is None:
+                return False
+            self.categories_version += 1
+            return True
+
+    # Fault injection
+
+    def should_throttle(self):
+        with self.lock:
+            self.request_count += 1
+            if self.throttle_rate and self.random.random() < self.throttle_rate:
+                self.throttled_count += 1
+                return True
+        return False
+
+
+def now_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def make_handler(api):
+    """Build a request handler class bound to a FakePocketsmith instance"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers and body are written separately
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, status, body=None, headers=()):
+            data = json.dumps(body).encode() if body is not None else b""
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def route(self, method):
+            if api.latency:
+                time.sleep(api.latency)
+            if api.should_throttle():
+                if method in ("POST", "PUT"):
+                    self.read_json()  # drain the body so the connection stays usable
+                return self.reply(429, {"error": "Too many requests"},
+                                  [("Retry-After", str(api.retry_after))])
+
+            url = urlparse(self.path)
+            parts = [part for part in url.path.split("/") if part]
+            if parts and parts[0] == "v2":
+                parts = parts[1:]
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+            if method == "GET" and len(parts) == 3 and parts[0] == "users" and parts[2] == "transactions":
+                page = int(query.get("page", 1))
+                per_page = int(query.get("per_page", 30))
+                category_id = int(query["category_id"]) if "category_id" in query else None
+                transactions, last_page = api.list_transactions(page, per_page, query.get("updated_since"),
+                                                                category_id)
+                base = f"http://{self.headers.get('Host')}{url.path}"
+                links = [f'<{base}?page=1&per_page={per_page}>; rel="first"',
+                         f'<{base}?page={last_page}&per_page={per_page}>; rel="last"']
+                if page < last_page:
+                    links.append(f'<{base}?page={page + 1}&per_page={per_page}>; rel="next"')
+                return self.reply(200, transactions, [("Link", ", ".join(links))])
+
+            if method == "PUT" and len(parts) == 2 and parts[0] == "transactions":
+                transaction = api.update_transaction(int(parts[1]), self.read_json())
+                return self.reply(200, transaction) if transaction else self.reply(404, {"error": "Not found"})
+
+            if len(parts) == 3 and parts[0] == "users" and parts[2] == "categories":
+                if method == "GET":
+                    with api.lock:
+                        categories = list(api.categories.values())
+                        etag = f'"{api.categories_version}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self.reply(304, headers=[("ETag", etag)])
+                    return self.reply(200, categories, [("ETag", etag)])
+                if method == "POST":
+                    return self.reply(201, api.create_category(self.read_json().get("title")))
+
+            if method == "DELETE" and len(parts) == 2 and parts[0] == "categories":
+                if api.delete_category(int(parts[1])):
+                    return self.reply(204)
+                return self.reply(404, {"error": "Not found"})
+
+            if method == "GET" and parts == ["me"]:
+                return self.reply(200, {"id": 1, "email": "benchmark@example.com"})
+
+            return self.reply(404, {"error": "Not found"})
+
+        def do_GET(self):
+            self.route("GET")
+
+        def do_PUT(self):
+            self.route("PUT")
+
+        def do_POST(self):
+            self.route("POST")
+
+        def do_DELETE(self):
+            self.route("DELETE")
+
+    return Handler
+
+
+def start_server(api, host="127.0.0.1", port=0):
+    """Serve api on a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v2"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local PocketSmith API stand-in')
+    parser.add_argument('--transactions', type=int, default=10_000, help='Number of synthetic transactions')
+    parser.add_argument('--port', type=int, default=0, help='Port to listen on (default: any free port)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Added latency per request')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                       help='Fraction of requests answered with 429 (default: 0)')
+    args = parser.parse_args()
+
+    api = FakePocketsmith(args.transactions, latency=args.latency_ms / 1000, throttle_rate=args.throttle_rate)
+    server, base_url = start_server(api, port=args.port)
+    print(f"Listening on {base_url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
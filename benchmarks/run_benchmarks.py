@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+PocketSmith Script Benchmarks
+
+Runs recategorise.py and cleanup_categories.py code paths against the local
+API stand-in (fake_pocketsmith.py) and reports throughput, request latency
+and peak memory for each scenario and transaction count:
+- remap: mirror sync plus a full remap of every transaction (--workers)
+- cleanup: category usage analysis paging the API directly
+
+Each scenario runs in a fresh child process and temporary directory, so peak
+RSS is measured per scenario and progress files never touch the repo.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 10000,100000,1000000]
+                                        [--workers 8] [--latency-ms 0] [--throttle-rate 0]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+DEFAULT_SIZES = "10000,100000,1000000"
+SCENARIOS = ("remap", "cleanup")
+USER_ID = 1
+
+
+class BenchClient:
+    """Minimal stand-in for PocketsmithClient exposing what the scripts read"""
+
+    def __init__(self, api_key):
+        self.api_client = SimpleNamespace(configuration=SimpleNamespace(api_key={'developerKey': api_key}))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_scenario(scenario, workers, prefetch):
+    """Run one scenario in this process and return its measurements"""
+    import cleanup_categories
+    import recategorise
+    from pocketsmith_session import get_session
+    from transaction_mirror import TransactionMirror
+
+    client = BenchClient("benchmark")
+    session = get_session(client, pool_size=workers + prefetch)
+    latencies = []
+    session.response_hooks.append(lambda method, path, status, elapsed: latencies.append(elapsed))
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if scenario == "remap":
+            progress = recategorise.load_progress()
+            mirror = TransactionMirror()
+            mirror.sync(client, USER_ID, prefetch=prefetch)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                processed, remapped = recategorise.process_pages(
+                    client, USER_ID, mirror.iter_pages(per_page=1000), progress, executor)
+        else:
+            counts, details = cleanup_categories.analyze_category_usage(client, USER_ID, prefetch=prefetch)
+            processed, remapped = sum(counts.values()), 0
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "transactions": processed,
+        "remapped": remapped,
+        "seconds": elapsed,
+        "transactions_per_sec": processed / elapsed if elapsed else 0.0,
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "throttle_events": session.rate_limiter.throttle_count,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def start_fake_server(size, latency_ms, throttle_rate):
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_pocketsmith.py"), "--transactions", str(size),
+         "--latency-ms", str(latency_ms), "--throttle-rate", str(throttle_rate)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    base_url = server.stdout.readline().strip().split()[-1]
+    return server, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark recategorise and cleanup against a local API stand-in')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'Comma-separated transaction counts (default: {DEFAULT_SIZES})')
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS), help='Comma-separated scenarios to run')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent updates for the remap scenario')
+    parser.add_argument('--prefetch', type=int, default=4, help='Pages fetched ahead')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latency injected by the fake server')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.workers, args.prefetch)))
+        return
+
+    print(f"{'size':>9} {'scenario':>9} {'tx/s':>10} {'seconds':>9} {'requests':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'429s':>6} {'peak RSS':>10}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        for scenario in args.scenarios.split(","):
+            server, base_url = start_fake_server(size, args.latency_ms, args.throttle_rate)
+            try:
+                env = dict(os.environ, POCKETSMITH_API_BASE_URL=base_url,
+                           POCKETSMITH_RATE="100000", POCKETSMITH_MAX_RATE="100000")
+                with tempfile.TemporaryDirectory() as workdir:
+                    output = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), "--child", scenario,
+                         "--workers", str(args.workers), "--prefetch", str(args.prefetch)],
+                        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+                    ).stdout
+            finally:
+                server.terminate()
+                server.wait()
+
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{size:>9,} {scenario:>9} {result['transactions_per_sec']:>10,.0f} {result['seconds']:>9.2f} "
+                  f"{result['requests']:>9,} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                  f"{result['throttle_events']:>6} {result['peak_rss_mb']:>8.1f}MB", flush=True)
+
+
+if __name__ == "__main__":
+    main()
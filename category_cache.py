@@ -0,0 +1,203 @@
+"""
+Category Catalogue Cache
+
+One shared, indexed copy of the user's category catalogue so that scripts do
+not each re-fetch it (target-category lookups used to list every category on
+each miss).
+
+- Indexed by id and by title; lookups return records.Category
+- Seeded from categories.json when it was written by this cache; within the
+  TTL it is used as-is, so a run makes at most one catalogue request (often
+  none)
+- Once stale (POCKETSMITH_CATEGORY_TTL seconds, default 900) the catalogue
+  is revalidated with If-None-Match when an ETag is known; a 304 simply
+  renews it, and a 200 whose newest updated_at and size are unchanged keeps
+  the existing indexes
+- Write-through: categories created or deleted through the cache update the
+  indexes and categories.json immediately
+
+categories.json keeps the format main.py has always written (a list of
+category objects, now including subcategories with their parent_id); the
+fetch time and ETag live alongside it in categories.meta.json.
+"""
+
+import json
+import os
+import threading
+import time
+
+from checkpoint_store import atomic_write_json
+from pocketsmith_session import get_api_key, get_session
+from records import Category
+
+CATEGORIES_FILE = "categories.json"
+DEFAULT_TTL = 15 * 60
+CATEGORY_FIELDS = ('id', 'title', 'colour', 'parent_id', 'is_bill', 'is_transfer', 'created_at', 'updated_at')
+
+
+def flatten_categories(categories, parent_id=None):
+    """Flatten the nested category tree returned by the API"""
+    for category in categories:
+        yield {**category, 'parent_id': category.get('parent_id', parent_id)}
+        yield from flatten_categories(category.get('children') or [], category.get('id'))
+
+
+def catalogue_version(categories):
+    """(count, newest updated_at) used to detect an unchanged catalogue"""
+    return len(categories), max((c.get('updated_at') or '' for c in categories), default='')
+
+
+class CategoryCache:
+    """Indexed category catalogue for one user"""
+
+    def __init__(self, client, user_id, path=CATEGORIES_FILE, ttl=None):
+        self.client = client
+        self.user_id = user_id
+        self.path = path
+        self.meta_path = f"{os.path.splitext(path)[0]}.meta.json"
+        self.ttl = ttl if ttl is not None else float(os.getenv('POCKETSMITH_CATEGORY_TTL', DEFAULT_TTL))
+        self.lock = threading.RLock()
+
+        self.by_id = {}
+        self.by_title = {}
+        self.etag = None
+        self.fetched_at = None
+        self.requests_made = 0
+        self.load_seed()
+
+    # Indexes
+
+    def _index(self, categories):
+        self.by_id = {}
+        self.by_title = {}
+        for category in flatten_categories(categories):
+            self._add(category)
+
+    def _add(self, category):
+        category = {field: category.get(field) for field in CATEGORY_FIELDS}
+        self.by_id[category['id']] = category
+        self.by_title.setdefault(category['title'], category['id'])
+
+    def _remove(self, category_id):
+        category = self.by_id.pop(category_id, None)
+        if category and self.by_title.get(category['title']) == category_id:
+            del self.by_title[category['title']]
+            for other in self.by_id.values():
+                if other['title'] == category['title']:
+                    self.by_title[other['title']] = other['id']
+                    break
+
+    # Persistence
+
+    def load_seed(self):
+        """Seed from categories.json if this cache wrote it (freshness is checked on use)"""
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get('user_id') != self.user_id:
+                return False
+            with open(self.path, 'r') as f:
+                categories = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return False
+        self._index(categories)
+        self.etag = meta.get('etag')
+        self.fetched_at = meta['fetched_at']
+        return True
+
+    def save(self):
+        atomic_write_json(self.path, list(self.by_id.values()), indent=2)
+        atomic_write_json(self.meta_path, {
+            'user_id': self.user_id,
+            'fetched_at': self.fetched_at,
+            'etag': self.etag,
+        })
+
+    # Revalidation
+
+    def is_fresh(self):
+        return self.fetched_at is not None and time.time() - self.fetched_at <= self.ttl
+
+    def refresh(self, force=False):
+        """Fetch or revalidate the catalogue if stale (or force); returns True if it changed"""
+        with self.lock:
+            if not force and self.is_fresh():
+                return False
+
+            headers = {'If-None-Match': self.etag} if self.etag and self.by_id else {}
+            response = get_session(self.client).get(f"/users/{self.user_id}/categories", headers=headers)
+            self.requests_made += 1
+            if response.status_code == 304:
+                self.fetched_at = time.time()
+                self.save()
+                return False
+            response.raise_for_status()
+
+            categories = list(flatten_categories(response.json()))
+            changed = catalogue_version(categories) != catalogue_version(list(self.by_id.values()))
+            if changed:
+                self._index(categories)
+            self.etag = response.headers.get('ETag')
+            self.fetched_at = time.time()
+            self.save()
+            return changed
+
+    # Lookups
+
+    def all(self):
+        """All categories as Category records"""
+        self.refresh()
+        return [Category.from_api(category) for category in self.by_id.values()]
+
+    def raw(self):
+        """All categories as flat API dicts (see CATEGORY_FIELDS)"""
+        self.refresh()
+        return list(self.by_id.values())
+
+    def get(self, category_id):
+        self.refresh()
+        category = self.by_id.get(category_id)
+        return Category.from_api(category) if category else None
+
+    def find_by_title(self, title):
+        self.refresh()
+        category_id = self.by_title.get(title)
+        return Category.from_api(self.by_id[category_id]) if category_id is not None else None
+
+    # Write-through
+
+    def create(self, title):
+        """Create a category, raising on failure; returns its Category record"""
+        self.refresh()
+        response = get_session(self.client).post(f"/users/{self.user_id}/categories", json={"title": title})
+        if response.status_code != 201:  # Not created
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        category = response.json()
+        with self.lock:
+            self._add(category)
+            self.save()
+        return Category.from_api(category)
+
+    def delete(self, category_id):
+        """Delete a category, raising on failure"""
+        self.refresh()
+        response = get_session(self.client).delete(f"/categories/{category_id}")
+        response.raise_for_status()
+        with self.lock:
+            self._remove(category_id)
+            self.save()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_category_cache(client, user_id, **kwargs):
+    """Get the shared CategoryCache for a client and user, creating it on first use"""
+    key = (get_api_key(client), user_id)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = CategoryCache(client, user_id, **kwargs)
+            _caches[key] = cache
+        return cache
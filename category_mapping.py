@@ -9,6 +9,11 @@ Each mapping entry contains:
 - old_category_id: The original PocketSmith category ID
 - new_category: The name of the new category to map to
 - label: Optional sub-label for more specific categorization
+
+compile_remap_table() turns the mapping into a RemapTable keyed by old ID
+once the new categories exist (see recategorise.process_pages). Payee rules
+(payee_rules.py) are compiled into the same table and take precedence over
+the mapping.
 """
 
 # Category mapping - old category IDs that should be remapped to new categories
@@ -160,6 +165,11 @@ def get_all_old_category_ids():
     return list(CATEGORY_MAPPING.keys())
 
 
+def get_new_category_names():
+    """Get the distinct new category names targeted by the mapping"""
+    return sorted({mapping["new_category"] for mapping in CATEGORY_MAPPING.values()})
+
+
 def get_categories_by_new_name(new_category_name):
     """Get all old category IDs that map to a specific new category name"""
     return [
@@ -181,4 +191,80 @@ def get_mapping_summary():
         "total_old_categories": len(CATEGORY_MAPPING),
         "unique_new_categories": len(new_categories),
         "new_category_breakdown": new_categories
-    }
\ No newline at end of file
+    }
+
+class RemapTable:
+    """CATEGORY_MAPPING compiled against real category IDs for one run
+    
+    Maps old category ID -> (new category ID, frozenset of labels to add,
+    new category name). New category IDs are resolved once, when the table
+    is compiled, so remapping a transaction is a single dict lookup plus a
+    set union. A new category ID of None means its category could not be
+    resolved (e.g. creation failed).
+    
+    rules is an optional payee_rules.RuleMatcher, with rule_entries holding
+    an entry of the same shape for each of its rules.
+    """
+
+    __slots__ = ('entries', 'rules', 'rule_entries', '_merged')
+
+    def __init__(self, entries, rules=None, rule_entries=()):
+        self.entries = entries
+        self.rules = rules
+        self.rule_entries = rule_entries
+        self._merged = {}
+
+    def __contains__(self, old_category_id):
+        return old_category_id in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, old_category_id):
+        """Return (new_category_id, labels_to_add, new_category_name) or None if unmapped"""
+        return self.entries.get(old_category_id)
+
+    def match_rules(self, transaction):
+        """Entry of the first payee rule matching a records.Transaction, or None"""
+        if self.rules is None or not transaction.payee:
+            return None
+        index = self.rules.match(transaction.payee, transaction.amount)
+        return None if index is None else self.rule_entries[index]
+
+    def merge_labels(self, current_labels, labels_to_add):
+        """Existing labels (order kept) followed by any missing labels, sorted
+        
+        current_labels must be a tuple (as on records.Transaction). Results are
+        memoised per distinct label combination and returned as shared tuples.
+        """
+        key = (current_labels, labels_to_add)
+        merged = self._merged.get(key)
+        if merged is None:
+            merged = current_labels + tuple(sorted(labels_to_add.difference(current_labels)))
+            self._merged[key] = merged
+        return merged
+
+
+def compile_remap_table(resolve_category_id, mapping=None, rules=None):
+    """Build a RemapTable, resolving each new category name once
+    
+    resolve_category_id(new_category_name) returns the category ID to use
+    (or None if it cannot be resolved). rules is an optional
+    payee_rules.RuleMatcher (see payee_rules.load_rules).
+    """
+    mapping = CATEGORY_MAPPING if mapping is None else mapping
+    resolved = {}
+    entries = {}
+    for old_category_id, entry in mapping.items():
+        name = entry["new_category"]
+        if name not in resolved:
+            resolved[name] = resolve_category_id(name)
+        labels = frozenset([entry["label"]]) if entry["label"] else frozenset()
+        entries[old_category_id] = (resolved[name], labels, name)
+    rule_entries = []
+    for rule in (rules.rules if rules is not None else ()):
+        if rule.category not in resolved:
+            resolved[rule.category] = resolve_category_id(rule.category)
+        labels = frozenset([rule.label]) if rule.label else frozenset()
+        rule_entries.append((resolved[rule.category], labels, rule.category))
+    return RemapTable(entries, rules, rule_entries)
@@ -0,0 +1,169 @@
+"""
+Recategorisation Checkpoint Store
+
+Progress is split across three files so that checkpointing costs O(new ids)
+rather than rewriting the whole history every page:
+- recategorise_progress.json: small JSON state (counters, created categories, ...)
+- recategorise_processed.ids: compacted snapshot of processed transaction IDs
+  (sorted, packed signed 64-bit integers)
+- recategorise_processed.log: append-only log of IDs processed since the
+  last compaction (packed signed 64-bit integers)
+
+The JSON state and the snapshot are written atomically (temp file, fsync,
+rename). Log appends are fsynced; a torn trailing record left by a crash is
+ignored on load. When the log grows past a threshold it is merged into the
+snapshot and truncated.
+
+Processed IDs are held in memory by a ProcessedIndex, which gives O(1)
+membership and insert and remembers which IDs have not been checkpointed yet.
+
+Older progress files that embed a "processed_transactions" list are migrated
+automatically on first load (the original is kept as a .bak file).
+"""
+
+import json
+import os
+import shutil
+from array import array
+
+ID_TYPECODE = 'q'
+COMPACT_THRESHOLD = 50_000  # log entries before merging into the snapshot
+
+
+def atomic_write_bytes(path, data):
+    """Write bytes to path via a temp file, fsync and rename"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path, data, **kwargs):
+    atomic_write_bytes(path, json.dumps(data, **kwargs).encode())
+
+
+def read_ids(path):
+    """Read packed IDs from path, ignoring any torn trailing record"""
+    ids = array(ID_TYPECODE)
+    if not os.path.exists(path):
+        return ids
+    with open(path, 'rb') as f:
+        data = f.read()
+    usable = len(data) - len(data) % ids.itemsize
+    ids.frombytes(data[:usable])
+    return ids
+
+
+def append_ids(path, ids):
+    """Durably append packed IDs to path"""
+    with open(path, 'ab') as f:
+        f.write(array(ID_TYPECODE, ids).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class ProcessedIndex:
+    """Set of processed transaction IDs with O(1) membership and insert
+    
+    IDs added since the last checkpoint are tracked separately so the store
+    only has to append those to its log.
+    """
+
+    __slots__ = ('ids', 'pending')
+
+    def __init__(self, ids=()):
+        self.ids = set(ids)
+        self.pending = []
+
+    def __contains__(self, transaction_id):
+        return transaction_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def add(self, transaction_id):
+        if transaction_id not in self.ids:
+            self.ids.add(transaction_id)
+            self.pending.append(transaction_id)
+
+    def take_pending(self):
+        """Return and clear the IDs added since the last checkpoint"""
+        pending, self.pending = self.pending, []
+        return pending
+
+    def to_bytes(self):
+        """Serialize as sorted packed signed 64-bit integers"""
+        return array(ID_TYPECODE, sorted(self.ids)).tobytes()
+
+
+class CheckpointStore:
+    """Crash-safe progress state plus append-only processed-id log"""
+
+    def __init__(self, state_path, snapshot_path, log_path, compact_threshold=COMPACT_THRESHOLD):
+        self.state_path = state_path
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path
+        self.compact_threshold = compact_threshold
+        self.log_entries = 0
+
+    def load(self):
+        """Return (state, ProcessedIndex), migrating legacy progress files first"""
+        state = None
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+            if "processed_transactions" in state:
+                self.migrate(state)
+
+        snapshot = read_ids(self.snapshot_path)
+        log = read_ids(self.log_path)
+        self.log_entries = len(log)
+        processed = ProcessedIndex(snapshot)
+        processed.ids.update(log)
+        return state, processed
+
+    def save(self, state, processed):
+        """Checkpoint: append IDs added since the last save, then rewrite the small state"""
+        self.append(processed.take_pending())
+        if self.needs_compaction():
+            self.compact(processed)
+        self.write_state(state)
+
+    def migrate(self, state):
+        """One-time migration of an embedded processed_transactions list"""
+        processed = state.pop("processed_transactions")
+        backup_path = f"{self.state_path}.bak"
+        print(f"Migrating {len(processed)} processed transaction IDs out of {self.state_path} "
+              f"(original kept as {backup_path})")
+        shutil.copy2(self.state_path, backup_path)
+
+        ids = array(ID_TYPECODE, sorted(set(processed)) + list(read_ids(self.log_path)))
+        atomic_write_bytes(self.snapshot_path, ids.tobytes())
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self.write_state(state)
+
+    def write_state(self, state):
+        atomic_write_json(self.state_path, state, indent=2)
+
+    def append(self, new_ids):
+        """Durably append newly processed IDs to the log"""
+        if not new_ids:
+            return
+        append_ids(self.log_path, new_ids)
+        self.log_entries += len(new_ids)
+
+    def compact(self, processed):
+        """Rewrite the snapshot from the full ProcessedIndex and truncate the log"""
+        atomic_write_bytes(self.snapshot_path, processed.to_bytes())
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self.log_entries = 0
+
+    def needs_compaction(self):
+        return self.log_entries >= self.compact_threshold
@@ -8,10 +8,15 @@ preserving categories that begin with underscore (our new categories).
 
 Features:
 - Paginated transaction fetching for efficient processing
+- Local SQLite transaction mirror with incremental sync (see transaction_mirror.py)
 - Comprehensive category usage analysis
-- Safe deletion with multiple verification steps
+- Safe deletion with multiple verification steps: candidates are deleted in
+  parallel, and each is re-verified as still empty (against transactions
+  updated since the analysis) immediately before its delete is sent
 - Progress tracking with timestamped snapshots
 - Never deletes underscore-prefixed categories
+- Request, phase and deletion metrics exported to cleanup_metrics.json / .prom
+- Optional --profile run profiling (see profiling.py)
 """
 
 import os
@@ -19,14 +24,28 @@ import sys
 import json
 import time
 import argparse
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from collections import defaultdict
 
-import requests
 from pocketsmith import PocketsmithClient
 
 # Import shared category mapping
+from category_cache import get_category_cache
 from category_mapping import CATEGORY_MAPPING
+from metrics import metrics
+from pagination import DEFAULT_LOOKAHEAD, iter_pages, parse_link_header
+from pocketsmith_session import get_session
+import profiling
+from transaction_mirror import CLOCK_SKEW_MARGIN, TransactionMirror
+from transaction_table import TransactionTable
+from transaction_stream import read_transactions_page
+
+METRICS_BASENAME = "cleanup_metrics"  # .json and .prom
+PROFILE_BASENAME = "cleanup_profile"  # .pstats, .collapsed and _memory.json
+DELETE_WORKERS = 4
+VERIFY_INTERVAL = 1.0  # seconds a usage re-check is shared between concurrent deletes
 
 
 def load_progress():
@@ -57,34 +76,18 @@ def save_progress(progress):
         print(f"Warning: Could not save progress: {e}")
 
 
-def parse_link_header(link_header):
-    """Parse pagination links from Link header"""
-    links = {}
-    if link_header:
-        for link in link_header.split(','):
-            parts = link.strip().split(';')
-            if len(parts) == 2:
-                url = parts[0].strip('<>')
-                rel = parts[1].split('=')[1].strip('"')
-                links[rel] = url
-    return links
-
-
 def get_transactions_page(client, user_id, page=1, per_page=1000):
     """Get a page of transactions using direct API calls"""
     try:
-        api_key = client.api_client.configuration.api_key['developerKey']
-        url = f"https://api.pocketsmith.com/v2/users/{user_id}/transactions"
-        headers = {
-            "accept": "application/json",
-            "X-Developer-Key": api_key
-        }
+        session = get_session(client)
         params = {'page': page, 'per_page': per_page}
         
-        response = requests.get(url, headers=headers, params=params)
+        with metrics.phase("fetch"):
+            response = session.get(f"/users/{user_id}/transactions", params=params, stream=True)
         response.raise_for_status()
         
-        transactions_data = response.json()
+        with metrics.phase("decode"):
+            transactions_data = read_transactions_page(response)
         link_header = response.headers.get('Link', '')
         links = parse_link_header(link_header)
         
@@ -96,78 +99,150 @@ def get_transactions_page(client, user_id, page=1, per_page=1000):
 
 
 def get_all_categories(client, user_id):
-    """Get all categories for the user"""
+    """Get all categories for the user as Category records (from the shared catalogue cache)"""
     try:
-        categories = client.categories.list_categories(user_id)
-        return categories
+        return get_category_cache(client, user_id).all()
     except Exception as e:
         print(f"Error fetching categories: {e}")
         return []
 
 
-def delete_category(client, category_id):
-    """Delete a category using direct API call"""
-    try:
-        api_key = client.api_client.configuration.api_key['developerKey']
-        url = f"https://api.pocketsmith.com/v2/categories/{category_id}"
-        headers = {
-            "accept": "application/json",
-            "X-Developer-Key": api_key
-        }
-        
-        response = requests.delete(url, headers=headers)
+class UsageVerifier:
+    """Re-checks category usage immediately before deletion
+    
+    Fetches only transactions updated since the usage analysis started (less
+    a clock-skew margin), so a category that gained a transaction after it was
+    counted as empty is never deleted. A re-check is shared by deletes that
+    start within VERIFY_INTERVAL of it.
+    
+    Categories that pass that check are then confirmed empty against the live
+    API (one transaction listed with a category_id filter), since the analysis
+    itself may have come from a mirror that missed rows.
+    """
+
+    def __init__(self, client, user_id, since, interval=VERIFY_INTERVAL):
+        self.client = client
+        self.user_id = user_id
+        self.since = since
+        self.interval = interval
+        self.used = set()  # category IDs on transactions updated since the analysis
+        self.checked_at = None
+        self.checks = 0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            if self.checked_at is not None and time.monotonic() - self.checked_at < self.interval:
+                return
+            started = datetime.now(timezone.utc)
+            session = get_session(self.client)
+            params = {'updated_since': (self.since - CLOCK_SKEW_MARGIN).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                      'per_page': 1000}
+            page = 1
+            while True:
+                response = session.get(f"/users/{self.user_id}/transactions", params={**params, 'page': page},
+                                       stream=True)
+                response.raise_for_status()
+                links = parse_link_header(response.headers.get('Link', ''))
+                transactions = read_transactions_page(response)
+                self.used.update(t.category_id for t in transactions if t.category_id)
+                if not transactions or 'next' not in links:
+                    break
+                page += 1
+            self.since = started
+            self.checked_at = time.monotonic()
+            self.checks += 1
+
+    def is_empty(self, category_id):
+        self.refresh()
+        if category_id in self.used:
+            return False
+        return self.confirm_empty(category_id)
+
+    def confirm_empty(self, category_id):
+        """Ask the API whether any transaction is still in the category"""
+        response = get_session(self.client).get(f"/users/{self.user_id}/transactions",
+                                                params={'category_id': category_id, 'per_page': 1}, stream=True)
         response.raise_for_status()
-        return True
-        
+        transactions = read_transactions_page(response)
+        if any(transaction.category_id != category_id for transaction in transactions):
+            # Only an empty filtered listing proves the category is unused
+            raise RuntimeError("transaction listing did not apply the category_id filter; not deleting")
+        return not transactions
+
+
+def delete_verified(client, user_id, candidate, verifier):
+    """Re-verify a deletion candidate is still empty, then delete it
+    
+    Returns the outcome ("deleted", "skipped_in_use" or "failed") with its
+    latency; runs on a worker thread.
+    """
+    start = time.perf_counter()
+    result = {"id": candidate["id"], "title": candidate["title"]}
+    try:
+        if verifier.is_empty(candidate["id"]):
+            get_category_cache(client, user_id).delete(candidate["id"])
+            result["outcome"] = "deleted"
+        else:
+            result["outcome"] = "skipped_in_use"
     except Exception as e:
-        print(f"Error deleting category {category_id}: {e}")
-        return False
+        result["outcome"] = "failed"
+        result["error"] = str(e)
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
 
 
-def analyze_category_usage(client, user_id):
-    """Analyze category usage across all transactions"""
+def analyze_category_usage(client, user_id, prefetch=DEFAULT_LOOKAHEAD, mirror=None):
+    """Analyze category usage across all transactions
+    
+    When a TransactionMirror is given it is synced and queried instead of
+    paging through the full transaction history.
+    """
     print("=== ANALYZING CATEGORY USAGE ===")
-    print("Fetching all transactions to analyze category usage...")
     
     category_counts = defaultdict(int)
     category_details = {}
     transaction_count = 0
-    page = 1
     
     # Fetch all categories first to get their details
     all_categories = get_all_categories(client, user_id)
     for category in all_categories:
-        if hasattr(category, 'id'):
-            category_details[category.id] = {
-                'id': category.id,
-                'title': category.title,
-                'is_transfer': getattr(category, 'is_transfer', False)
-            }
+        category_details[category.id] = {
+            'id': category.id,
+            'title': category.title,
+            'is_transfer': category.is_transfer
+        }
     
-    # Process all transactions page by page
-    while True:
-        print(f"Fetching page {page}...")
-        transactions, links = get_transactions_page(client, user_id, page)
+    if mirror:
+        mirror.sync(client, user_id, prefetch=prefetch)
+        for category_id, title, is_transfer, count, total_amount, first_date, last_date in mirror.category_usage():
+            category_counts[category_id] = count
+            if category_id not in category_details:
+                category_details[category_id] = {
+                    'id': category_id,
+                    'title': title or 'Unknown',
+                    'is_transfer': bool(is_transfer)
+                }
+            category_details[category_id].update(
+                total_amount=total_amount, first_date=first_date, last_date=last_date)
+        transaction_count = mirror.transaction_count()
+        print(f"Analysis complete: {transaction_count} total transactions in local mirror")
+        print(f"Found {len(category_counts)} categories in use")
+        return category_counts, category_details
+    
+    # Load all transactions page by page into a columnar table, fetching ahead
+    print("Fetching all transactions to analyze category usage...")
+    table = TransactionTable()
+    pages = iter_pages(lambda page_number: get_transactions_page(client, user_id, page_number), lookahead=prefetch)
+    for page, transactions, links in pages:
+        print(f"Fetched page {page}")
         
         if not transactions:
             print("No more transactions found")
             break
         
-        # Count category usage in this page
-        for transaction in transactions:
-            transaction_count += 1
-            category = transaction.get('category')
-            if category and isinstance(category, dict):
-                category_id = category.get('id')
-                if category_id:
-                    category_counts[category_id] += 1
-                    # Store category details if we don't have them
-                    if category_id not in category_details:
-                        category_details[category_id] = {
-                            'id': category_id,
-                            'title': category.get('title', 'Unknown'),
-                            'is_transfer': category.get('is_transfer', False)
-                        }
+        table.extend(transactions)
+        profiling.mark_page(page)
         
         print(f"Page {page} complete: processed {len(transactions)} transactions")
         
@@ -175,9 +250,21 @@ def analyze_category_usage(client, user_id):
         if 'next' not in links:
             print("Reached last page of transactions")
             break
-        
-        page += 1
-        time.sleep(0.1)  # Rate limiting
+    pages.close()
+    
+    # Group by category over the whole table at once
+    for category_id, stats in table.category_stats().items():
+        category_counts[category_id] = stats['count']
+        if category_id not in category_details:
+            category = table.categories[category_id]
+            category_details[category_id] = {
+                'id': category_id,
+                'title': category.title or 'Unknown',
+                'is_transfer': category.is_transfer
+            }
+        category_details[category_id].update(
+            total_amount=stats['total_amount'], first_date=stats['first_date'], last_date=stats['last_date'])
+    transaction_count = len(table)
     
     print(f"Analysis complete: {transaction_count} total transactions processed")
     print(f"Found {len(category_counts)} categories in use")
@@ -185,7 +272,8 @@ def analyze_category_usage(client, user_id):
     return category_counts, category_details
 
 
-def cleanup_old_categories(client, user_id, dry_run=False):
+def cleanup_old_categories(client, user_id, dry_run=False, prefetch=DEFAULT_LOOKAHEAD, mirror=None,
+                           workers=DELETE_WORKERS):
     """Clean up old empty categories after verification"""
     print("\n=== CATEGORY CLEANUP ===")
     
@@ -193,7 +281,10 @@ def cleanup_old_categories(client, user_id, dry_run=False):
     progress = load_progress()
     
     # Analyze current category usage
-    category_counts, category_details = analyze_category_usage(client, user_id)
+    analysis_started = datetime.now(timezone.utc)
+    with metrics.phase("analyze"):
+        category_counts, category_details = analyze_category_usage(client, user_id, prefetch=prefetch, mirror=mirror)
+    profiling.mark_page("analysis")
     
     # Create snapshot of current state
     snapshot = {
@@ -214,7 +305,10 @@ def cleanup_old_categories(client, user_id, dry_run=False):
             "id": category_id,
             "title": category_title,
             "transaction_count": usage_count,
-            "is_transfer": details.get('is_transfer', False)
+            "is_transfer": details.get('is_transfer', False),
+            "total_amount": details.get('total_amount'),
+            "first_date": details.get('first_date'),
+            "last_date": details.get('last_date')
         }
         
         # Never delete underscore-prefixed categories (our new categories)
@@ -265,34 +359,57 @@ def cleanup_old_categories(client, user_id, dry_run=False):
     # Perform deletions if not in dry-run mode
     deleted_count = 0
     deletion_errors = []
+    skipped_in_use = []
+    deletion_outcomes = []
     
     if not dry_run and snapshot["deletion_candidates"]:
-        print(f"\nDeleting {len(snapshot['deletion_candidates'])} empty categories...")
+        print(f"\nDeleting {len(snapshot['deletion_candidates'])} empty categories ({workers} at a time)...")
+        verifier = UsageVerifier(client, user_id, analysis_started)
+        deletion_started = time.perf_counter()
         
-        for candidate in snapshot["deletion_candidates"]:
-            category_id = candidate['id']
-            category_title = candidate['title']
-            
-            print(f"Deleting category '{category_title}' (ID: {category_id})...")
-            if delete_category(client, category_id):
-                progress["deleted_categories"].append({
-                    "id": category_id,
-                    "title": category_title,
-                    "deleted_at": datetime.now().isoformat(),
-                    "mapped_to": candidate['mapped_to']
-                })
-                deleted_count += 1
-                time.sleep(0.5)  # Rate limiting for deletions
-            else:
-                deletion_errors.append({
-                    "id": category_id,
-                    "title": category_title,
-                    "error": "API deletion failed"
-                })
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(delete_verified, client, user_id, candidate, verifier): candidate
+                for candidate in snapshot["deletion_candidates"]
+            }
+            for future in as_completed(futures):
+                candidate = futures[future]
+                result = future.result()
+                deletion_outcomes.append(result)
+                metrics.inc("category_deletions_total", outcome=result["outcome"])
+                category_id = candidate['id']
+                category_title = candidate['title']
+                
+                if result["outcome"] == "deleted":
+                    print(f"Deleted category '{category_title}' (ID: {category_id}) in {result['latency_ms']}ms")
+                    progress["deleted_categories"].append({
+                        "id": category_id,
+                        "title": category_title,
+                        "deleted_at": datetime.now().isoformat(),
+                        "mapped_to": candidate['mapped_to']
+                    })
+                    deleted_count += 1
+                elif result["outcome"] == "skipped_in_use":
+                    print(f"Skipped category '{category_title}' (ID: {category_id}): "
+                          f"transactions were assigned to it after the analysis")
+                    skipped_in_use.append(category_id)
+                else:
+                    print(f"Error deleting category {category_id}: {result['error']}")
+                    deletion_errors.append({
+                        "id": category_id,
+                        "title": category_title,
+                        "error": result["error"]
+                    })
+        
+        print(f"Deletion finished in {time.perf_counter() - deletion_started:.1f}s "
+              f"({verifier.checks} usage re-checks)")
+        profiling.mark_page("deletions")
     
     # Update snapshot with deletion results
     snapshot["deletions_performed"] = deleted_count
     snapshot["deletion_errors"] = deletion_errors
+    snapshot["deletions_skipped_in_use"] = skipped_in_use
+    snapshot["deletion_outcomes"] = deletion_outcomes
     snapshot["dry_run"] = dry_run
     
     # Save progress
@@ -304,6 +421,8 @@ def cleanup_old_categories(client, user_id, dry_run=False):
         print(f"✓ Found {len(snapshot['deletion_candidates'])} categories ready for deletion")
     else:
         print(f"✓ Successfully deleted {deleted_count} empty categories")
+        if skipped_in_use:
+            print(f"✓ Kept {len(skipped_in_use)} categories that gained transactions since the analysis")
         if deletion_errors:
             print(f"✗ Failed to delete {len(deletion_errors)} categories")
     
@@ -317,6 +436,14 @@ def main():
     parser = argparse.ArgumentParser(description='Clean up old empty PocketSmith categories')
     parser.add_argument('--dry-run', action='store_true', 
                        help='Analyze categories but do not delete anything')
+    parser.add_argument('--prefetch', type=int, default=DEFAULT_LOOKAHEAD,
+                       help=f'Number of transaction pages to fetch ahead (default: {DEFAULT_LOOKAHEAD})')
+    parser.add_argument('--no-mirror', action='store_true',
+                       help='Page through the API directly instead of syncing the local transaction mirror')
+    parser.add_argument('--workers', type=int, default=DELETE_WORKERS,
+                       help=f'Number of concurrent category deletions (default: {DELETE_WORKERS})')
+    parser.add_argument('--profile', action='store_true',
+                       help=f'Profile the run (cProfile, stack samples, per-page memory) into {PROFILE_BASENAME}.*')
     args = parser.parse_args()
     
     # Get API key
@@ -328,6 +455,9 @@ def main():
     
     # Initialize client
     client = PocketsmithClient(api_key)
+    metrics.start_exporter(METRICS_BASENAME)
+    if args.profile:
+        profiling.start(PROFILE_BASENAME)
     
     try:
         # Get user info
@@ -339,7 +469,10 @@ def main():
             print("\n🔍 DRY RUN MODE - No categories will be deleted")
         
         # Perform cleanup
-        deleted_count, error_count = cleanup_old_categories(client, user_id, dry_run=args.dry_run)
+        mirror = None if args.no_mirror else TransactionMirror()
+        deleted_count, error_count = cleanup_old_categories(client, user_id, dry_run=args.dry_run,
+                                                            prefetch=args.prefetch, mirror=mirror,
+                                                            workers=args.workers)
         
         if not args.dry_run:
             print(f"\n✅ Cleanup completed: {deleted_count} categories deleted")
@@ -349,6 +482,10 @@ def main():
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    finally:
+        profiling.stop()
+        metrics.stop_exporter(METRICS_BASENAME)
+        metrics.print_summary()
 
 
 if __name__ == "__main__":
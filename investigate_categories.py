@@ -7,16 +7,27 @@ why these transactions weren't remapped during the recategorization process.
 
 Usage:
     export POCKETSMITH_API_KEY='your_api_key_here'
-    uv run python investigate_categories.py
+    uv run python investigate_categories.py [--no-mirror] [--exact-counts]
+
+Samples and counts for all investigated categories are gathered at once:
+from the local mirror with two queries, or with --no-mirror from a single
+scan of the transaction history that stops once every category has its
+samples (--exact-counts reads the whole history instead).
 """
 
 import os
 import sys
 import json
-import requests
+import argparse
 from datetime import datetime
 from pocketsmith import PocketsmithClient
 
+from outcome_ledger import OUTCOMES_FILE, OutcomeLedger
+from pagination import DEFAULT_LOOKAHEAD, iter_pages, parse_link_header
+from pocketsmith_session import get_session
+from transaction_mirror import TransactionMirror
+from transaction_stream import read_transactions_page
+
 # Categories to investigate (from user's list)
 CATEGORIES_TO_INVESTIGATE = {
     7312544: {"name": "Eating out", "count": 53},
@@ -38,95 +49,74 @@ except ImportError:
     print("Warning: Could not import category mapping")
     CATEGORY_MAPPING = {}
 
+SCAN_PAGE_SIZE = 500
 
-def get_transactions_for_category(client, user_id, category_id, limit=3):
-    """Get sample transactions for a specific category"""
-    try:
-        api_key = client.api_client.configuration.api_key['developerKey']
-        url = f"https://api.pocketsmith.com/v2/users/{user_id}/transactions"
-        headers = {
-            "accept": "application/json",
-            "X-Developer-Key": api_key
-        }
-        
-        # First try with category_id parameter
-        params = {
-            'category_id': category_id,
-            'per_page': limit,
-            'page': 1
-        }
-        
-        response = requests.get(url, headers=headers, params=params)
-        
-        if response.status_code == 400:
-            # If 400 error, try fetching more transactions and filter manually
-            print(f"  ⚠️  Direct category filter failed, searching in recent transactions...")
-            matching_transactions = []
-            
-            # Search through multiple pages if needed
-            for page in range(1, 4):  # Search first 3 pages (up to 1500 transactions)
-                params = {
-                    'per_page': 500,
-                    'page': page
-                }
-                
-                page_response = requests.get(url, headers=headers, params=params)
-                page_response.raise_for_status()
-                
-                page_transactions = page_response.json()
-                if not page_transactions:
-                    break  # No more transactions
-                
-                for transaction in page_transactions:
-                    category = transaction.get('category', {})
-                    if isinstance(category, dict) and category.get('id') == category_id:
-                        matching_transactions.append(transaction)
-                        if len(matching_transactions) >= limit:
-                            return matching_transactions
-                
-                # If we found some transactions and this is the first page, 
-                # show progress
-                if page == 1 and matching_transactions:
-                    print(f"    Found {len(matching_transactions)} transaction(s) so far...")
-            
-            return matching_transactions
-        
-        response.raise_for_status()
-        transactions = response.json()
-        return transactions
+
+def get_transactions_page(client, user_id, page, per_page=SCAN_PAGE_SIZE):
+    """Get one page of transactions as (records, parsed Link header)"""
+    session = get_session(client)
+    response = session.get(f"/users/{user_id}/transactions",
+                           params={'page': page, 'per_page': per_page}, stream=True)
+    response.raise_for_status()
+    return read_transactions_page(response), parse_link_header(response.headers.get('Link', ''))
+
+
+def scan_categories(client, user_id, category_ids, limit=3, exact_counts=False, prefetch=DEFAULT_LOOKAHEAD):
+    """Collect samples and counts for all categories in one pass over the transaction history
+
+    The scan stops as soon as every category has `limit` samples unless
+    exact_counts is set, in which case the whole history is read.
+    Returns (samples, counts, complete) where complete says whether counts are exact.
+    """
+    samples = {category_id: [] for category_id in category_ids}
+    counts = {category_id: 0 for category_id in category_ids}
+    wanted = set(category_ids)
+    waiting = set(category_ids)
+    complete = True
+    
+    pages = iter_pages(lambda page: get_transactions_page(client, user_id, page), lookahead=prefetch)
+    for page, transactions, links in pages:
+        for transaction in transactions:
+            category_id = transaction.category_id
+            if category_id not in wanted:
+                continue
+            counts[category_id] += 1
+            if len(samples[category_id]) < limit:
+                samples[category_id].append(transaction)
+                if len(samples[category_id]) == limit:
+                    waiting.discard(category_id)
         
+        print(f"  Scanned page {page} ({len(waiting)} categories still need samples)")
+        if not waiting and not exact_counts and 'next' in links:
+            print("  All categories have their samples, stopping early")
+            complete = False
+            break
+    pages.close()
+    
+    return samples, counts, complete
+
+
+def get_category_samples(client, user_id, category_ids, limit=3, mirror=None, exact_counts=False):
+    """Get sample transactions and counts for every investigated category at once"""
+    if mirror:
+        samples, counts = mirror.sample_categories(category_ids, limit=limit)
+        return samples, counts, True
+    
+    print(f"Scanning transaction history once for {len(category_ids)} categories...")
+    try:
+        return scan_categories(client, user_id, category_ids, limit=limit, exact_counts=exact_counts)
     except Exception as e:
-        print(f"  ❌ Error fetching transactions for category {category_id}: {e}")
-        return []
+        print(f"  ❌ Error scanning transactions: {e}")
+        return {category_id: [] for category_id in category_ids}, {}, False
 
 
 def format_transaction_details(transaction):
-    """Format transaction details for display"""
-    # Handle both dict and object formats
-    if isinstance(transaction, dict):
-        tx_id = transaction.get('id')
-        payee = transaction.get('payee', 'Unknown')
-        amount = transaction.get('amount', 0)
-        date = transaction.get('date', 'Unknown')
-        category = transaction.get('category', {})
-        labels = transaction.get('labels', [])
-        is_transfer = transaction.get('is_transfer', False)
-    else:
-        tx_id = getattr(transaction, 'id', None)
-        payee = getattr(transaction, 'payee', 'Unknown')
-        amount = getattr(transaction, 'amount', 0)
-        date = getattr(transaction, 'date', 'Unknown')
-        category = getattr(transaction, 'category', {})
-        labels = getattr(transaction, 'labels', [])
-        is_transfer = getattr(transaction, 'is_transfer', False)
-    
-    # Extract category info
-    if isinstance(category, dict):
-        cat_id = category.get('id')
-        cat_title = category.get('title', 'Unknown')
-    else:
-        cat_id = getattr(category, 'id', None) if category else None
-        cat_title = getattr(category, 'title', 'Unknown') if category else 'Unknown'
+    """Format a Transaction record for display"""
+    payee = transaction.payee or 'Unknown'
+    amount = transaction.amount or 0
+    date = transaction.date or 'Unknown'
+    cat_id = transaction.category_id
+    cat_title = transaction.category_title or 'Unknown'
     
     # Format amount with proper sign
     amount_str = f"${abs(float(amount)):.2f}"
@@ -136,12 +126,12 @@ def format_transaction_details(transaction):
         amount_str = f"+{amount_str}"
     
     # Format labels
-    labels_str = f" [Labels: {', '.join(labels)}]" if labels else ""
+    labels_str = f" [Labels: {', '.join(transaction.labels)}]" if transaction.labels else ""
     
     # Check if this is a transfer
-    transfer_str = " [TRANSFER]" if is_transfer else ""
+    transfer_str = " [TRANSFER]" if transaction.is_transfer else ""
     
-    return f"    • ID: {tx_id} | {payee[:40]:<40} | {amount_str:>10} | {date} | Cat: {cat_title} ({cat_id}){labels_str}{transfer_str}"
+    return f"    • ID: {transaction.id} | {payee[:40]:<40} | {amount_str:>10} | {date} | Cat: {cat_title} ({cat_id}){labels_str}{transfer_str}"
 
 
 def check_mapping_status(category_id):
@@ -154,6 +144,13 @@ def check_mapping_status(category_id):
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Investigate transactions left in old PocketSmith categories')
+    parser.add_argument('--no-mirror', action='store_true',
+                       help='Query the API directly instead of syncing the local transaction mirror')
+    parser.add_argument('--exact-counts', action='store_true',
+                       help='With --no-mirror, scan the whole history for exact counts instead of stopping once samples are found')
+    args = parser.parse_args()
+    
     # Get API key
     api_key = os.getenv('POCKETSMITH_API_KEY')
     if not api_key:
@@ -171,11 +168,21 @@ def main():
         print(f"Investigating categories for user: {user_info.get('email', 'Unknown')}")
         print(f"Current time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
+        # Outcomes recorded by recategorise.py for transactions it did not remap
+        outcomes = OutcomeLedger.load(OUTCOMES_FILE)
+        
+        mirror = None
+        if not args.no_mirror:
+            mirror = TransactionMirror()
+            mirror.sync(client, user_id)
+        
         print("\n" + "="*100)
         print("CATEGORY INVESTIGATION REPORT")
         print("="*100)
         
         total_transactions_found = 0
+        samples, counts, counts_exact = get_category_samples(
+            client, user_id, list(CATEGORIES_TO_INVESTIGATE), limit=3, mirror=mirror, exact_counts=args.exact_counts)
         
         for category_id, info in CATEGORIES_TO_INVESTIGATE.items():
             print(f"\n📁 Category: {info['name']} (ID: {category_id}) - Expected {info['count']} transactions")
@@ -185,9 +192,10 @@ def main():
             mapping_status = check_mapping_status(category_id)
             print(f"  Mapping Status: {mapping_status}")
             
-            # Fetch sample transactions
-            print(f"  Fetching sample transactions...")
-            transactions = get_transactions_for_category(client, user_id, category_id, limit=3)
+            transactions = samples[category_id]
+            if category_id in counts:
+                at_least = "" if counts_exact else "at least "
+                print(f"  Transactions currently in category: {at_least}{counts[category_id]}")
             
             if not transactions:
                 print(f"  ⚠️  No transactions found for this category!")
@@ -199,17 +207,15 @@ def main():
             
             for i, transaction in enumerate(transactions, 1):
                 print(format_transaction_details(transaction))
+                reason = outcomes.reason(transaction.id)
+                if reason:
+                    detail = outcomes.detail(transaction.id)
+                    print(f"      Recategorisation outcome: {reason}" + (f" ({detail})" if detail else ""))
             
             # Check if any have underscore-prefixed categories (our new categories)
             remapped_count = 0
             for transaction in transactions:
-                if isinstance(transaction, dict):
-                    category = transaction.get('category', {})
-                    cat_title = category.get('title', '') if isinstance(category, dict) else ''
-                else:
-                    category = getattr(transaction, 'category', None)
-                    cat_title = getattr(category, 'title', '') if category else ''
-                
+                cat_title = transaction.category_title
                 if cat_title and cat_title.startswith('_'):
                     remapped_count += 1
             
@@ -257,6 +263,9 @@ def main():
                     progress_info = f"\n📊 RECATEGORIZATION STATUS:"
                     progress_info += f"\n  ✅ Recategorization completed at: {end_time}"
                     progress_info += f"\n  📈 Processed: {total_processed} transactions, Remapped: {total_remapped} transactions"
+                    if len(outcomes):
+                        progress_info += "\n  📋 Not remapped: " + ", ".join(
+                            f"{reason} {count}" for reason, count in outcomes.counts().items() if count)
                     
                     # Check if our found transactions are newer than the completion time
                     if total_transactions_found > 0:
@@ -1,8 +1,9 @@
 import os
 import sys
-import json
 from pocketsmith import PocketsmithClient
 
+from category_cache import get_category_cache
+
 
 def main():
     # Get API key from environment variable
@@ -21,32 +22,17 @@ def main():
         user_info = client.users.get_me()
         user_id = user_info['id']
         
-        # Fetch categories
+        # Fetch (or revalidate) categories; the cache writes them to categories.json
         print("Fetching categories from PocketSmith...")
-        categories = client.categories.list_categories(user_id)
+        cache = get_category_cache(client, user_id)
+        cache.refresh(force=True)
+        categories = cache.raw()
         
         if not categories:
             print("No categories found in your PocketSmith account.")
             return
         
-        # Convert categories to serializable format and save to JSON file
-        categories_data = []
-        for category in categories:
-            cat_dict = {
-                'id': category.get('id'),
-                'title': category.get('title'),
-                'colour': category.get('colour'),
-                'parent_id': category.get('parent_id'),
-                'is_bill': category.get('is_bill'),
-                'is_transfer': category.get('is_transfer'),
-                'created_at': category.get('created_at').isoformat() if category.get('created_at') else None,
-                'updated_at': category.get('updated_at').isoformat() if category.get('updated_at') else None
-            }
-            categories_data.append(cat_dict)
-        
-        with open('categories.json', 'w') as f:
-            json.dump(categories_data, f, indent=2)
-        print(f"Saved {len(categories)} categories to categories.json")
+        print(f"Saved {len(categories)} categories to {cache.path}")
         
         print(f"\nFound {len(categories)} categories:")
         print("-" * 50)
@@ -0,0 +1,238 @@
+"""
+Run Metrics
+
+A small in-process metrics registry shared by the scripts:
+- counters, e.g. HTTP requests per endpoint and status, throttle retries
+- latency histograms per endpoint and per processing phase
+- gauges, e.g. the adaptive request rate and update queue depth
+
+Every PocketSmith REST call is recorded automatically (see
+pocketsmith_session.py); endpoints are labelled by method and path with
+numeric IDs replaced by {id}. Scripts time their own phases with
+`metrics.phase(name)`.
+
+Snapshots are written as <basename>.json and as a Prometheus textfile
+(<basename>.prom, for node_exporter's textfile collector) periodically by
+start_exporter() and at the end of a run by export().
+
+Configuration (optional):
+- POCKETSMITH_METRICS_INTERVAL: seconds between periodic exports (default: 60)
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from checkpoint_store import atomic_write_bytes
+
+PREFIX = "pocketsmith_"
+DEFAULT_EXPORT_INTERVAL = 60.0
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_ID_PATTERN = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(method, path):
+    """'PUT /transactions/123' -> 'PUT /transactions/{id}' (query strings and hosts dropped)"""
+    path = re.sub(r"^https?://[^/]+(/v\d+)?", "", path).split('?', 1)[0]
+    return f"{method} {_ID_PATTERN.sub('/{id}', path)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with count, sum and max"""
+
+    __slots__ = ('buckets', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(LATENCY_BUCKETS) and value > LATENCY_BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-th quantile (None when empty)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.buckets)),
+        }
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and histograms keyed by name and labels"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._exporter = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    # Recording
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block as one occurrence of a processing phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("phase_seconds", time.perf_counter() - start, phase=name)
+
+    def record_request(self, method, path, status_code, elapsed):
+        """PocketsmithSession response hook: count and time every HTTP attempt"""
+        endpoint = endpoint_label(method, path)
+        self.inc("http_requests_total", endpoint=endpoint, status=str(status_code))
+        self.observe("http_request_seconds", elapsed, endpoint=endpoint)
+
+    # Export
+
+    def snapshot(self):
+        """All metrics as a JSON-serialisable dict"""
+        def labelled(items, render):
+            return [{"name": name, "labels": dict(labels), **render(value)} for (name, labels), value in items]
+
+        with self.lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "counters": labelled(sorted(self.counters.items()), lambda value: {"value": value}),
+                "gauges": labelled(sorted(self.gauges.items()), lambda value: {"value": value}),
+                "histograms": labelled(sorted(self.histograms.items()), Histogram.to_dict),
+            }
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        def series(name, labels, extra=()):
+            pairs = [*labels, *extra]
+            if not pairs:
+                return f"{PREFIX}{name}"
+            rendered = ",".join(f"{key}={json.dumps(str(value))}" for key, value in pairs)
+            return f"{PREFIX}{name}{{{rendered}}}"
+
+        lines = [f"# TYPE {PREFIX}uptime_seconds gauge", f"{PREFIX}uptime_seconds {time.time() - self.started:.3f}"]
+        with self.lock:
+            for kind, items in (("counter", self.counters), ("gauge", self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(items.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{series(name, labels)} {value}")
+            typed = set()
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], histogram.buckets):
+                    cumulative += count
+                    lines.append(f"{series(name + '_bucket', labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{series(name + '_sum', labels)} {histogram.sum:.6f}")
+                lines.append(f"{series(name + '_count', labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, basename):
+        """Atomically write <basename>.json and <basename>.prom"""
+        atomic_write_bytes(f"{basename}.json", json.dumps(self.snapshot(), indent=2).encode())
+        atomic_write_bytes(f"{basename}.prom", self.to_prometheus().encode())
+
+    def start_exporter(self, basename, interval=None):
+        """Export in a background thread every interval seconds until stop_exporter()"""
+        if interval is None:
+            interval = float(os.getenv('POCKETSMITH_METRICS_INTERVAL', DEFAULT_EXPORT_INTERVAL))
+        if self._exporter is not None or interval <= 0:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.export(basename)
+                except OSError as e:
+                    print(f"Warning: could not export metrics: {e}")
+
+        self._stop.clear()
+        self._exporter = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        self._exporter.start()
+
+    def stop_exporter(self, basename=None):
+        """Stop periodic exports, writing a final snapshot if basename is given"""
+        if self._exporter is not None:
+            self._stop.set()
+            self._exporter.join()
+            self._exporter = None
+        if basename:
+            self.export(basename)
+
+    def print_summary(self):
+        """Print where the run spent its time, by phase and by endpoint"""
+        with self.lock:
+            phases = sorted(((dict(labels)["phase"], histogram) for (name, labels), histogram
+                             in self.histograms.items() if name == "phase_seconds"),
+                            key=lambda item: -item[1].sum)
+            endpoints = sorted(((dict(labels)["endpoint"], histogram) for (name, labels), histogram
+                                in self.histograms.items() if name == "http_request_seconds"),
+                               key=lambda item: -item[1].sum)
+        if phases:
+            print("\nTime by phase:")
+            for phase, histogram in phases:
+                print(f"  {phase:<12} {histogram.sum:>9.2f}s over {histogram.count} calls")
+        if endpoints:
+            print("Requests by endpoint:")
+            for endpoint, histogram in endpoints:
+                p95 = histogram.quantile(0.95)
+                print(f"  {endpoint:<40} {histogram.count:>7} requests, {histogram.sum:>8.2f}s, "
+                      f"p95 <= {p95 * 1000:.0f}ms")
+
+
+metrics = Metrics()
@@ -0,0 +1,141 @@
+"""
+Recategorisation Outcome Ledger
+
+Records why a transaction was not remapped, keyed by transaction ID, with an
+index per reason:
+- uncategorized: the transaction has no category
+- unmapped_category: its category is not in CATEGORY_MAPPING
+- category_creation_failed: its target category could not be created
+- already_remapped: it already has an underscore-prefixed category
+- error: the update request failed (the error message is kept as detail)
+
+Each transaction has at most one outcome; recording a new reason moves it
+between indexes and a successful remap clears it. Inserts, dedupe, per-reason
+counts and lookups are all O(1), and each reason index keeps insertion order
+so summaries can list the first few IDs.
+
+The ledger is persisted as an append-only JSON-lines log
+(recategorise_outcomes.jsonl) of [id, reason, detail] records, where a null
+reason clears the entry. Only changes since the last checkpoint are appended;
+the log is rewritten from memory once it holds far more records than live
+entries.
+"""
+
+import json
+import os
+
+from checkpoint_store import atomic_write_bytes
+
+OUTCOMES_FILE = "recategorise_outcomes.jsonl"
+REASONS = ('uncategorized', 'unmapped_category', 'category_creation_failed', 'already_remapped', 'error')
+COMPACT_RATIO = 2  # rewrite once the log holds this many records per live entry
+COMPACT_MINIMUM = 10_000  # ...and at least this many records
+
+
+class OutcomeLedger:
+    """Per-transaction outcomes with one insertion-ordered index per reason"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.outcomes = {}  # transaction id -> (reason, detail)
+        self.by_reason = {reason: {} for reason in REASONS}  # reason -> {transaction id: None}
+        self.pending = []
+        self.log_records = 0
+
+    def __contains__(self, transaction_id):
+        return transaction_id in self.outcomes
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    # Updates
+
+    def record(self, transaction_id, reason, detail=None):
+        """Record the outcome for a transaction; returns False if it was already recorded"""
+        current = self.outcomes.get(transaction_id)
+        if current == (reason, detail):
+            return False
+        if current is not None:
+            del self.by_reason[current[0]][transaction_id]
+        self.outcomes[transaction_id] = (reason, detail)
+        self.by_reason[reason][transaction_id] = None
+        self.pending.append((transaction_id, reason, detail))
+        return True
+
+    def discard(self, transaction_id):
+        """Clear any outcome for a transaction (e.g. once it has been remapped)"""
+        current = self.outcomes.pop(transaction_id, None)
+        if current is not None:
+            del self.by_reason[current[0]][transaction_id]
+            self.pending.append((transaction_id, None, None))
+
+    # Queries
+
+    def reason(self, transaction_id):
+        current = self.outcomes.get(transaction_id)
+        return current[0] if current else None
+
+    def detail(self, transaction_id):
+        current = self.outcomes.get(transaction_id)
+        return current[1] if current else None
+
+    def count(self, reason):
+        return len(self.by_reason[reason])
+
+    def counts(self):
+        return {reason: len(ids) for reason, ids in self.by_reason.items()}
+
+    def ids(self, reason, limit=None):
+        """Transaction IDs with the given outcome, in the order they were first recorded"""
+        ids = self.by_reason[reason]
+        if limit is None:
+            return list(ids)
+        result = []
+        for transaction_id in ids:
+            if len(result) >= limit:
+                break
+            result.append(transaction_id)
+        return result
+
+    # Persistence
+
+    @classmethod
+    def load(cls, path=OUTCOMES_FILE):
+        """Replay the outcome log at path, ignoring a torn trailing record"""
+        ledger = cls(path)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        transaction_id, reason, detail = json.loads(line)
+                    except ValueError:
+                        continue
+                    if reason is None:
+                        ledger.discard(transaction_id)
+                    else:
+                        ledger.record(transaction_id, reason, detail)
+                    ledger.log_records += 1
+        ledger.pending = []
+        return ledger
+
+    def save(self):
+        """Append changes since the last save, compacting the log when it has grown stale"""
+        if not self.path or not self.pending:
+            return
+        if self.log_records + len(self.pending) > max(COMPACT_MINIMUM, COMPACT_RATIO * len(self.outcomes)):
+            self.compact()
+            return
+        with open(self.path, 'a') as f:
+            f.writelines(json.dumps(record) + "\n" for record in self.pending)
+            f.flush()
+            os.fsync(f.fileno())
+        self.log_records += len(self.pending)
+        self.pending = []
+
+    def compact(self):
+        """Rewrite the log with one record per live entry"""
+        lines = [json.dumps([transaction_id, reason, detail]) + "\n"
+                 for transaction_id, (reason, detail) in self.outcomes.items()]
+        atomic_write_bytes(self.path, "".join(lines).encode())
+        self.log_records = len(lines)
+        self.pending = []
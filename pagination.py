@@ -0,0 +1,84 @@
+"""
+Prefetching Page Iterator
+
+Transaction listings are paginated, and the Link header on each page exposes
+the next and last page URLs. Rather than fetching page N, processing it and
+only then requesting page N+1, iter_pages keeps a bounded queue of pages in
+flight on a small thread pool so network fetches overlap with processing.
+
+Until the last page number is known, only the next page is fetched ahead.
+Once a Link header reveals rel="last", up to `lookahead` pages are requested
+in parallel. Pages are always yielded in order.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_LOOKAHEAD = 4
+
+
+def parse_link_header(link_header):
+    """Parse Link header to extract next/prev URLs"""
+    if not link_header:
+        return {}
+    
+    links = {}
+    for link in link_header.split(','):
+        link = link.strip()
+        if '; rel=' in link:
+            url_part, rel_part = link.split('; rel=', 1)
+            url = url_part.strip('<>')
+            rel = rel_part.strip('"')
+            links[rel] = url
+    return links
+
+
+def page_number_from_url(url):
+    """Extract the page query parameter from a pagination URL"""
+    try:
+        return int(parse_qs(urlparse(url).query)['page'][0])
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+def iter_pages(fetch_page, start_page=1, lookahead=DEFAULT_LOOKAHEAD):
+    """Yield (page, items, links) in page order while prefetching ahead
+
+    fetch_page(page) must return (items, links) where links is a parsed Link
+    header. Iteration stops after the first page that is empty or has no
+    rel="next" link; pages fetched speculatively beyond that are discarded.
+    """
+    lookahead = max(1, lookahead)
+    executor = ThreadPoolExecutor(max_workers=lookahead)
+    in_flight = deque()
+    next_page = start_page
+    last_page = None
+
+    try:
+        in_flight.append((next_page, executor.submit(fetch_page, next_page)))
+        next_page += 1
+
+        while in_flight:
+            page, future = in_flight.popleft()
+            items, links = future.result()
+
+            if last_page is None and 'last' in links:
+                last_page = page_number_from_url(links['last'])
+
+            has_more = bool(items) and 'next' in links
+            if has_more:
+                # Without a known last page, stay one page ahead; otherwise fan out
+                window = lookahead if last_page is not None else 1
+                while len(in_flight) < window and (last_page is None or next_page <= last_page):
+                    in_flight.append((next_page, executor.submit(fetch_page, next_page)))
+                    next_page += 1
+
+            yield page, items, links
+
+            if not has_more:
+                break
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,273 @@
+"""
+Payee Classification
+
+Suggests a new category (and label) for transactions the mapping could not
+remap - those whose old category is not in CATEGORY_MAPPING, or that have no
+category at all - by asking an LLM about their payees.
+
+- Transactions are grouped by normalised payee, so each payee is classified
+  once however many transactions it has
+- Payees are sent many to a prompt (BATCH_SIZE), with several prompts in
+  flight at once
+- Decisions are kept in a persistent cache (payee_classifications.json)
+  keyed by model and payee, so later runs with the same model only ask about
+  new payees. "Don't know" answers are not cached, so they are asked again
+  (and another model gets its own chance), and answers from the local
+  stand-in model are never persisted
+- Answers are validated: the category must be one of the mapping's new
+  categories and the label one the mapping already uses
+
+Models are resolved through the `llm` package (e.g. "claude-3.5-haiku" with
+llm-anthropic installed and a key configured), imported only when a model is
+requested. The model ID "local" selects LocalModel, a keyword-based stand-in
+that speaks the same prompt/response format, so the whole stage runs offline.
+
+Configuration (optional):
+- POCKETSMITH_CLASSIFY_MODEL: llm model ID (default: claude-3.5-haiku)
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from category_mapping import CATEGORY_MAPPING, get_new_category_names
+from checkpoint_store import atomic_write_json
+from payee_rules import normalize_payee
+
+CACHE_FILE = "payee_classifications.json"
+CACHE_VERSION = 2
+DEFAULT_MODEL = "claude-3.5-haiku"
+BATCH_SIZE = 50  # payees per prompt
+CLASSIFY_WORKERS = 4  # prompts in flight
+
+SYSTEM_PROMPT = """You categorise personal finance transactions by payee.
+Answer with a JSON array only, one object per payee:
+{"id": <payee number>, "category": <one of the categories or null>, "label": <one of that category's labels or null>}
+Use null for the category when the payee is ambiguous or unknown."""
+
+
+def category_labels(mapping=CATEGORY_MAPPING):
+    """{new category: sorted labels used with it in the mapping}"""
+    labels = {name: set() for name in get_new_category_names()}
+    for entry in mapping.values():
+        if entry["label"]:
+            labels[entry["new_category"]].add(entry["label"])
+    return {name: sorted(values) for name, values in labels.items()}
+
+
+def format_amount(amount):
+    """Example amount for a prompt ("?" when the transaction has none)"""
+    return "?" if amount is None else f"{amount:.2f}"
+
+
+def build_prompt(batch, labels):
+    """batch is a list of (payee, example transaction); payees are numbered from 1"""
+    lines = ["Categories and their labels:"]
+    lines += [f"- {name}: {', '.join(values) or '(no labels)'}" for name, values in labels.items()]
+    lines += ["", "Payees (number, payee, example amount):"]
+    lines += [f"{number}\t{payee}\t{format_amount(example.amount)}" for number, (payee, example) in enumerate(batch, 1)]
+    return "\n".join(lines)
+
+
+def parse_decisions(text, batch, labels):
+    """Map a model response back onto the batch: {payee: (category, label)}"""
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end < start:
+        raise ValueError("response contains no JSON array")
+    decisions = {}
+    for item in json.loads(text[start:end + 1]):
+        try:
+            payee = batch[int(item["id"]) - 1][0]
+        except (KeyError, TypeError, ValueError, IndexError):
+            continue
+        category = item.get("category")
+        if category not in labels:
+            category = None
+        label = item.get("label") if category else None
+        if label not in labels.get(category, ()):
+            label = None
+        decisions[payee] = (category, label)
+    return decisions
+
+
+class LocalModel:
+    """Offline stand-in for an llm model: answers classification prompts from keywords"""
+
+    model_id = "local"
+
+    KEYWORDS = (
+        (("woolworths", "coles", "aldi", "iga", "supermarket"), "Groceries", "supermarkets"),
+        (("market", "grocer", "butcher", "bakery"), "Groceries", "markets"),
+        (("cafe", "coffee", "restaurant", "sushi", "bistro", "pub", "bar"), "Dining", "restaurants"),
+        (("uber eats", "menulog", "doordash", "pizza", "mcdonalds", "kfc", "takeaway"), "Dining", "takeout"),
+        (("shell", "bp", "caltex", "ampol", "7 eleven", "petrol", "fuel"), "Transport", "petrol"),
+        (("parking", "wilson", "secure park"), "Transport", "parking"),
+        (("linkt", "toll"), "Transport", "tolls"),
+        (("opal", "transport for", "myki", "go card", "train"), "Transport", "public-transport"),
+        (("qantas", "virgin australia", "jetstar", "airline"), "Holidays", "flights"),
+        (("hotel", "airbnb", "booking com", "motel"), "Holidays", "hotels"),
+        (("netflix", "spotify", "disney", "apple com", "google", "subscription"), "Bills", "subscriptions"),
+        (("telstra", "optus", "vodafone"), "Bills", "comms"),
+        (("agl", "origin energy", "energy", "water"), "Bills", "utilities"),
+        (("insurance", "nrma", "allianz", "medibank", "bupa"), "Bills", "insurance"),
+        (("pharmacy", "chemist", "medical", "dental", "doctor"), "Bills", "medical"),
+        (("bunnings", "ikea", "hardware"), "Household", "maintenance"),
+        (("vet", "petbarn", "pet"), "Household", "pets"),
+        (("atm", "cash withdrawal"), "Household", "cash"),
+        (("salary", "payroll", "wages"), "Income", "salary"),
+        (("ato", "tax office"), "Income", "tax"),
+        (("church", "parish"), "Giving", "church"),
+        (("charity", "donation", "red cross", "unicef"), "Giving", "charity"),
+        (("rent", "real estate"), "Mortgage", "rent"),
+        (("transfer", "bpay"), "Transfer", None),
+    )
+
+    class Response:
+        def __init__(self, text):
+            self._text = text
+
+        def text(self):
+            return self._text
+
+    PATTERNS = [(re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b"), category, label)
+                for keywords, category, label in KEYWORDS]
+
+    def classify(self, payee):
+        for pattern, category, label in self.PATTERNS:
+            if pattern.search(payee):
+                return category, label
+        return None, None
+
+    def prompt(self, prompt, system=None, **kwargs):
+        answers = []
+        for line in prompt.splitlines():
+            fields = line.split("\t")
+            if len(fields) == 3 and fields[0].isdigit():
+                category, label = self.classify(fields[1])
+                answers.append({"id": int(fields[0]), "category": category, "label": label})
+        return self.Response(json.dumps(answers))
+
+
+def get_model(model_id=None):
+    """Resolve a model ID: "local" for the offline stand-in, anything else through llm"""
+    model_id = model_id or os.getenv('POCKETSMITH_CLASSIFY_MODEL', DEFAULT_MODEL)
+    if model_id == LocalModel.model_id:
+        return LocalModel()
+    try:
+        import llm
+    except ImportError:
+        raise RuntimeError("The llm package is required for model classification "
+                           "(or use --classify-model local)") from None
+    return llm.get_model(model_id)
+
+
+class ClassificationCache:
+    """Persistent model -> normalised payee -> decision cache
+    
+    Only classified payees are kept; answers from LocalModel are not stored.
+    Call save() to write the stored decisions back to the file.
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.models = {}
+        self.dirty = False
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.models = data.get("models", {})
+            else:
+                # Version 1 was keyed by payee only and also held "don't know" answers
+                for payee, decision in data.get("payees", {}).items():
+                    model_id = decision.get("model")
+                    if decision.get("category") and model_id and model_id != LocalModel.model_id:
+                        self.models.setdefault(model_id, {})[payee] = {
+                            key: decision[key] for key in ("category", "label", "classified_at")}
+                self.dirty = True
+
+    def get(self, model_id, payee):
+        """Return this model's (category, label) for a payee, or None if not cached"""
+        decision = self.models.get(model_id, {}).get(payee)
+        return (decision["category"], decision["label"]) if decision else None
+
+    def store(self, model_id, decisions):
+        """Keep a model's classified payees ({payee: (category, label)}; unknowns are skipped)"""
+        if model_id == LocalModel.model_id:
+            return
+        classified_at = datetime.now().isoformat()
+        payees = self.models.setdefault(model_id, {})
+        for payee, (category, label) in decisions.items():
+            if category:
+                payees[payee] = {"category": category, "label": label, "classified_at": classified_at}
+                self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            atomic_write_json(self.path, {"version": CACHE_VERSION, "models": self.models}, indent=1)
+            self.dirty = False
+
+
+def classify_transactions(transactions, model, cache, batch_size=BATCH_SIZE, workers=CLASSIFY_WORKERS):
+    """Classify transactions by payee; returns ({transaction id: (category, label)}, stats)
+
+    Only payees missing from the cache for this model are sent to it; new
+    decisions are stored in the cache, which is saved once at the end.
+    Transactions whose payee could not be classified are left out of the
+    result.
+    """
+    labels = category_labels()
+    by_payee = {}
+    for transaction in transactions:
+        by_payee.setdefault(normalize_payee(transaction.payee), []).append(transaction)
+    by_payee.pop("", None)
+
+    model_id = getattr(model, "model_id", str(model))
+    decisions = {payee: cache.get(model_id, payee) for payee in by_payee}
+    to_classify = [(payee, group[0]) for payee, group in by_payee.items() if decisions[payee] is None]
+    batches = [to_classify[start:start + batch_size] for start in range(0, len(to_classify), batch_size)]
+    failed_payees = 0
+
+    def run_batch(batch):
+        response = model.prompt(build_prompt(batch, labels), system=SYSTEM_PROMPT)
+        return parse_decisions(response.text(), batch, labels)
+
+    if batches:
+        print(f"Classifying {len(to_classify)} payees in {len(batches)} prompts with {model_id}...")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(run_batch, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                batch_decisions = future.result()
+            except Exception as e:
+                print(f"  Classification prompt failed ({len(batch)} payees): {e}")
+                failed_payees += len(batch)
+                continue
+            decisions.update(batch_decisions)
+            cache.store(model_id, batch_decisions)
+    cache.save()
+
+    results = {}
+    for payee, group in by_payee.items():
+        decision = decisions[payee]
+        if decision and decision[0]:
+            for transaction in group:
+                results[transaction.id] = decision
+
+    transaction_count = sum(len(group) for group in by_payee.values())
+    stats = {
+        "transactions": transaction_count,
+        "payees": len(by_payee),
+        "cached_payees": len(by_payee) - len(to_classify),
+        "prompts": len(batches),
+        "failed_payees": failed_payees,
+        "classified_transactions": len(results),
+        # Against one call per transaction
+        "calls_saved_by_grouping": transaction_count - len(by_payee),
+        "calls_saved_by_cache": len(by_payee) - len(to_classify),
+        "calls_saved_by_batching": len(to_classify) - len(batches),
+    }
+    return results, stats
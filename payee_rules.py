@@ -0,0 +1,129 @@
+"""
+Payee Rules
+
+Declarative payee/amount rules that take precedence over the category-ID
+mapping, for knowledge the old categories cannot express (e.g. Linkt charges
+are Transport +tolls and Uber Eats is Dining +takeout whatever they were
+filed under). Rules are read from payee_rules.json if it exists; copy
+payee_rules.example.json to start one:
+
+    {"rules": [
+        {"payee": "linkt", "category": "Transport", "label": "tolls"},
+        {"payee": ["uber eats", "menulog"], "category": "Dining", "label": "takeout"},
+        {"payee": "opal", "max_amount": 0, "category": "Transport", "label": "public-transport"}
+    ]}
+
+- payee: one phrase or a list; matched as whole words against the payee
+  normalised by normalize_payee (case, punctuation and reference numbers
+  ignored, as when payee_classifier.py groups payees)
+- min_amount / max_amount: optional inclusive bounds on the signed amount
+- category: one of the mapping's new categories; label: optional
+- when several rules match, the first one in the file wins
+
+All phrases are compiled into one index keyed by word sequence, so matching a
+payee costs one lookup per word window (at most the longest phrase's length
+per word) no matter how many rules there are, and the candidate rules for
+each distinct payee are memoised. Amount bounds are checked on those
+candidates only.
+"""
+
+import json
+import os
+import re
+from collections import namedtuple
+
+from category_mapping import get_new_category_names
+
+RULES_FILE = "payee_rules.json"
+
+PayeeRule = namedtuple('PayeeRule', 'category label min_amount max_amount')
+
+_REFERENCE_TOKEN = re.compile(r"\b\w*\d{4,}\w*\b")  # card numbers, receipt and reference numbers
+_NON_WORD = re.compile(r"[^a-z0-9&' ]+")
+_LEGAL_SUFFIX = re.compile(r"( (pty|ltd|limited|inc|llc|co|plc))+$")
+
+
+def normalize_payee(payee):
+    """Collapse payee variants ('WOOLWORTHS 1234 SYDNEY', 'Woolworths') onto one key"""
+    if not payee:
+        return ""
+    text = _REFERENCE_TOKEN.sub(" ", payee.lower())
+    text = " ".join(_NON_WORD.sub(" ", text).split())
+    return _LEGAL_SUFFIX.sub("", text)
+
+
+class RuleMatcher:
+    """Compiled multi-phrase matcher over an ordered list of PayeeRule"""
+
+    __slots__ = ('rules', 'phrases', 'max_words', '_candidates')
+
+    def __init__(self, rules, phrases):
+        """rules is a list of PayeeRule; phrases is a list of (phrase, rule index)"""
+        self.rules = rules
+        self.phrases = {}
+        self.max_words = 0
+        for phrase, index in phrases:
+            words = tuple(normalize_payee(phrase).split())
+            if not words:
+                raise ValueError(f"Rule {index + 1}: payee phrase {phrase!r} is empty after normalisation")
+            self.phrases.setdefault(words, []).append(index)
+            self.max_words = max(self.max_words, len(words))
+        self._candidates = {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def candidates(self, payee):
+        """Indexes of rules with a phrase in this payee, in rule order (memoised per payee)"""
+        candidates = self._candidates.get(payee)
+        if candidates is None:
+            words = normalize_payee(payee).split()
+            found = set()
+            for start in range(len(words)):
+                for end in range(start + 1, min(start + self.max_words, len(words)) + 1):
+                    indexes = self.phrases.get(tuple(words[start:end]))
+                    if indexes:
+                        found.update(indexes)
+            candidates = self._candidates[payee] = tuple(sorted(found))
+        return candidates
+
+    def match(self, payee, amount):
+        """Index of the first rule matching the payee and amount, or None"""
+        for index in self.candidates(payee):
+            rule = self.rules[index]
+            if rule.min_amount is not None and (amount is None or amount < rule.min_amount):
+                continue
+            if rule.max_amount is not None and (amount is None or amount > rule.max_amount):
+                continue
+            return index
+        return None
+
+
+def compile_rules(definitions, categories=None):
+    """Validate rule definitions (dicts as in payee_rules.json) and compile them"""
+    categories = set(get_new_category_names() if categories is None else categories)
+    rules = []
+    phrases = []
+    for index, definition in enumerate(definitions):
+        payees = definition.get("payee")
+        payees = [payees] if isinstance(payees, str) else payees
+        if not payees or not all(isinstance(payee, str) for payee in payees):
+            raise ValueError(f"Rule {index + 1}: 'payee' must be a phrase or a list of phrases")
+        if definition.get("category") not in categories:
+            raise ValueError(f"Rule {index + 1}: unknown category {definition.get('category')!r} "
+                             f"(expected one of {', '.join(sorted(categories))})")
+        rules.append(PayeeRule(definition["category"], definition.get("label"),
+                               definition.get("min_amount"), definition.get("max_amount")))
+        phrases += [(payee, index) for payee in payees]
+    return RuleMatcher(rules, phrases)
+
+
+def load_rules(path=RULES_FILE):
+    """Compile the rule file at path, or return None if there is none"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        definitions = json.load(f).get("rules", [])
+    matcher = compile_rules(definitions)
+    print(f"Loaded {len(matcher)} payee rules from {path}")
+    return matcher
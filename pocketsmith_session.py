@@ -0,0 +1,149 @@
+"""
+PocketSmith REST Session
+
+This module provides the shared HTTP session used by all scripts for direct
+PocketSmith REST calls. A single keep-alive connection pool is reused across
+requests so that each transaction update does not pay a fresh TCP+TLS handshake.
+
+Configuration (all optional):
+- POCKETSMITH_API_BASE_URL: API base URL (default: https://api.pocketsmith.com/v2)
+- POCKETSMITH_POOL_SIZE: Maximum number of pooled keep-alive connections (default: 10)
+- POCKETSMITH_CONNECT_TIMEOUT: Connection timeout in seconds (default: 5)
+- POCKETSMITH_READ_TIMEOUT: Read timeout in seconds (default: 60)
+- POCKETSMITH_RATE: Initial request rate per second (default: 10)
+- POCKETSMITH_MAX_RATE: Upper bound for the adaptive request rate (default: 50)
+- POCKETSMITH_MAX_RETRIES: Retries for throttled (429/503) requests (default: 5)
+
+Every request is paced by a shared AdaptiveRateLimiter (see rate_limiter.py),
+and throttled requests are retried after backing off. Requests, latencies,
+retries and the current rate are recorded in the shared metrics registry
+(see metrics.py).
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import endpoint_label, metrics
+from rate_limiter import (
+    DEFAULT_MAX_RATE,
+    DEFAULT_RATE,
+    THROTTLE_STATUS_CODES,
+    AdaptiveRateLimiter,
+    parse_retry_after,
+)
+
+API_BASE_URL = "https://api.pocketsmith.com/v2"
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 5
+
+
+class PocketsmithSession:
+    """Pooled HTTP session with pre-built PocketSmith auth headers"""
+
+    def __init__(self, api_key, base_url=None, pool_size=None, timeout=None, rate_limiter=None,
+                 max_retries=None):
+        self.base_url = (base_url or os.getenv('POCKETSMITH_API_BASE_URL') or API_BASE_URL).rstrip('/')
+        self.pool_size = pool_size or int(os.getenv('POCKETSMITH_POOL_SIZE', DEFAULT_POOL_SIZE))
+        self.timeout = timeout or (
+            float(os.getenv('POCKETSMITH_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)),
+            float(os.getenv('POCKETSMITH_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)),
+        )
+
+        self.max_retries = max_retries if max_retries is not None else int(
+            os.getenv('POCKETSMITH_MAX_RETRIES', DEFAULT_MAX_RETRIES))
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(
+            rate=float(os.getenv('POCKETSMITH_RATE', DEFAULT_RATE)),
+            max_rate=float(os.getenv('POCKETSMITH_MAX_RATE', DEFAULT_MAX_RATE)),
+        )
+
+        # Callables invoked as hook(method, path, status_code, elapsed_seconds)
+        # after every HTTP attempt, e.g. for latency measurement
+        self.response_hooks = [metrics.record_request]
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "accept": "application/json",
+            "X-Developer-Key": api_key,
+        })
+
+    def url(self, path):
+        """Build a full API URL from a path such as /transactions/123"""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        """Send a rate-limited request over the pooled connection
+        
+        Throttled responses (429/503) are retried up to max_retries times; the
+        final response is returned as-is so callers keep their status checks.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        url = self.url(path)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            start = time.perf_counter()
+            response = self.session.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - start
+            for hook in self.response_hooks:
+                hook(method, path, response.status_code, elapsed)
+            if response.status_code not in THROTTLE_STATUS_CODES:
+                if response.ok:
+                    self.rate_limiter.on_success()
+                    metrics.set_gauge("request_rate_limit", self.rate_limiter.rate)
+                return response
+            
+            self.rate_limiter.on_throttle(parse_retry_after(response.headers.get('Retry-After')))
+            metrics.set_gauge("request_rate_limit", self.rate_limiter.rate)
+            if attempt >= self.max_retries:
+                return response
+            response.close()  # release the connection of a streamed response before retrying
+            attempt += 1
+            metrics.inc("http_retries_total", endpoint=endpoint_label(method, path))
+            print(f"  Throttled (HTTP {response.status_code}) on {method} {path}, "
+                  f"retrying at {self.rate_limiter.rate:.1f} req/s (attempt {attempt}/{self.max_retries})")
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_api_key(client):
+    """Extract the developer key from a PocketsmithClient"""
+    return client.api_client.configuration.api_key['developerKey']
+
+
+def get_session(client, **kwargs):
+    """Get the shared session for a PocketsmithClient, creating it on first use"""
+    api_key = get_api_key(client)
+    with _sessions_lock:
+        session = _sessions.get(api_key)
+        if session is None:
+            session = PocketsmithSession(api_key, **kwargs)
+            _sessions[api_key] = session
+        return session
@@ -0,0 +1,159 @@
+"""
+Run Profiling
+
+Opt-in profiling for long runs (--profile on recategorise.py and
+cleanup_categories.py). While active it collects:
+- a cProfile of the run, written as <basename>.pstats (open with
+  `python -m pstats` or snakeviz); before Python 3.12 it only covers the
+  main thread
+- wall-clock stack samples of every thread (including the update and
+  prefetch pools), written in the collapsed format used by flamegraph.pl and
+  speedscope as <basename>.collapsed
+- tracemalloc snapshots after each page, written as <basename>_memory.json
+  with current/peak traced memory and the allocation sites that grew most
+  since the previous page
+
+Scripts call profiling.mark_page(page) once per page; it does nothing unless
+a profile is running, so the hot loop pays nothing by default.
+"""
+
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+TRACEMALLOC_FRAMES = 1
+TOP_ALLOCATIONS = 10
+
+_active = None
+
+
+class StackSampler(threading.Thread):
+    """Background thread counting collapsed stacks of all other threads"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: re.sub(r"_\d+$", "", thread.name) for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                frames.append(names.get(ident, "thread"))
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class RunProfiler:
+    """cProfile + stack sampler + per-page tracemalloc report for one run"""
+
+    def __init__(self, basename, top=TOP_ALLOCATIONS):
+        self.basename = basename
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler()
+        self.pages = []
+        self.previous = None
+        self.started = None
+
+    def start(self):
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.previous = self._snapshot()
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    def mark_page(self, page):
+        """Record traced memory and the top allocation growth since the previous page"""
+        self.profile.disable()
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = self._snapshot()
+        growth = snapshot.compare_to(self.previous, 'lineno')[:self.top]
+        self.previous = snapshot
+        self.pages.append({
+            "page": page,
+            "elapsed_seconds": round(time.perf_counter() - self.started, 3),
+            "current_mb": round(current / 1e6, 3),
+            "peak_mb": round(peak / 1e6, 3),
+            "top_growth": [
+                {
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_kb": round(stat.size / 1e3, 1),
+                    "size_diff_kb": round(stat.size_diff / 1e3, 1),
+                    "count_diff": stat.count_diff,
+                }
+                for stat in growth
+            ],
+        })
+        tracemalloc.reset_peak()
+        self.profile.enable()
+
+    def stop(self):
+        """Stop profiling and write the report files; returns their paths"""
+        self.profile.disable()
+        self.sampler.stop()
+        tracemalloc.stop()
+
+        paths = [f"{self.basename}.pstats", f"{self.basename}.collapsed", f"{self.basename}_memory.json"]
+        self.profile.dump_stats(paths[0])
+        with open(paths[1], 'w') as f:
+            for stack, count in self.sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(paths[2], 'w') as f:
+            json.dump({
+                "sample_interval_seconds": self.sampler.interval,
+                "stack_samples": self.sampler.samples,
+                "pages": self.pages,
+            }, f, indent=2)
+        return paths
+
+
+def start(basename):
+    """Start profiling the current run"""
+    global _active
+    _active = RunProfiler(basename)
+    _active.start()
+    print(f"Profiling enabled: writing {basename}.pstats, .collapsed and _memory.json at the end of the run")
+
+
+def mark_page(page):
+    if _active is not None:
+        _active.mark_page(page)
+
+
+def stop():
+    """Stop profiling (if running) and print where the reports were written"""
+    global _active
+    if _active is None:
+        return
+    profiler, _active = _active, None
+    paths = profiler.stop()
+    print(f"\nProfile written: {', '.join(paths)}")
+    print(f"  Flame graph: flamegraph.pl {paths[1]} > profile.svg (or load it in speedscope)")
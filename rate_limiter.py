@@ -0,0 +1,119 @@
+"""
+Adaptive Rate Limiter
+
+Token bucket shared by every PocketSmith REST call. The refill rate adapts to
+server responses using AIMD (additive increase, multiplicative decrease):
+- Each successful response nudges the rate up by a small fixed step
+- A 429/503 response halves the rate and honours any Retry-After header;
+  throttles arriving while already backing off (e.g. for requests that were
+  in flight together) count as the same episode and do not cut it again
+
+This replaces fixed sleeps between requests, so scripts run at the highest
+rate the API currently allows and back off automatically when throttled.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+THROTTLE_STATUS_CODES = (429, 503)
+
+DEFAULT_RATE = 10.0  # requests per second
+DEFAULT_BURST = 10
+DEFAULT_MIN_RATE = 0.5
+DEFAULT_MAX_RATE = 50.0
+DEFAULT_INCREASE = 0.1  # requests per second added on each success
+DEFAULT_DECREASE = 0.5  # multiplier applied on each throttle response
+DEFAULT_BACKOFF = 1.0  # initial pause in seconds when throttled without Retry-After
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateLimiter:
+    """Thread-safe token bucket with AIMD rate adjustment"""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, min_rate=DEFAULT_MIN_RATE,
+                 max_rate=DEFAULT_MAX_RATE, increase=DEFAULT_INCREASE, decrease=DEFAULT_DECREASE,
+                 backoff=DEFAULT_BACKOFF):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.backoff = backoff
+
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = None
+        self.throttle_count = 0
+        self.consecutive_throttles = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        """Additive increase after a successful response"""
+        with self.lock:
+            self.consecutive_throttles = 0
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        """Multiplicative decrease after a 429/503, pausing all callers
+        
+        The rate is cut at most once per throttle episode: throttles received
+        during the resulting pause, or within one refill interval of the last
+        decrease, only extend the pause to any longer Retry-After.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.throttle_count += 1
+            if now < self.paused_until or (
+                    self.last_decrease is not None and now - self.last_decrease < 1 / self.rate):
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+                return
+            self.last_decrease = now
+            self.consecutive_throttles += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = 0.0
+            if retry_after is None:
+                # Exponential backoff while the server keeps throttling
+                retry_after = self.backoff * 2 ** min(self.consecutive_throttles - 1, 5)
+            self.paused_until = max(self.paused_until, now + retry_after)
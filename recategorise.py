@@ -8,141 +8,184 @@ using labels to retain granular information.
 Usage:
     export POCKETSMITH_API_KEY='your_api_key_here'
     python recategorise.py [--test-limit N]  # Test mode with N transactions
+    python recategorise.py --workers 8       # Send up to 8 updates concurrently
+    python recategorise.py --no-mirror       # Page the API instead of the local mirror
+    python recategorise.py --incremental     # Only transactions changed since the last run
+    python recategorise.py --since 2025-06-01  # Only transactions changed since a date
+    python recategorise.py --watch --workers 4 # Keep running, remapping new transactions as they land
+    python recategorise.py --profile         # Also write CPU/stack/memory profiles (see profiling.py)
+    python recategorise.py --classify classified.jsonl  # LLM-suggest categories for unmapped payees
+    python recategorise.py --apply classified.jsonl     # ...and apply them after review
+    python recategorise.py --plan-batches    # Dry run: report the batched update plan
+    python recategorise.py --plan plan.jsonl # Write intended changes from the local mirror
+    python recategorise.py --apply plan.jsonl --workers 8  # Apply (and resume) a plan
     python cleanup_categories.py             # Cleanup empty old categories
+
+Payee rules in payee_rules.json (see payee_rules.py and
+payee_rules.example.json), when present, are applied before the category
+mapping.
+
+Request counts and latencies per endpoint, time per phase (fetch, decode,
+decide, update, checkpoint) and gauges are exported to
+recategorise_metrics.json / .prom every minute and at the end of the run.
 """
 
 import os
 import sys
-import json
-import time
 import argparse
 import re
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from pocketsmith import PocketsmithClient
 
 # Import shared category mapping
-from category_mapping import CATEGORY_MAPPING
+from category_cache import get_category_cache
+from category_mapping import compile_remap_table, get_new_category_names
+from checkpoint_store import CheckpointStore, append_ids, atomic_write_json, read_ids
+from metrics import metrics
+from outcome_ledger import OUTCOMES_FILE, OutcomeLedger
+from payee_classifier import ClassificationCache, classify_transactions, get_model
+from payee_rules import load_rules
+from pagination import DEFAULT_LOOKAHEAD, iter_pages, parse_link_header
+from pocketsmith_session import DEFAULT_POOL_SIZE, get_session
+import profiling
+from records import Transaction
+from remap_plan import build_plan, print_plan_summary, read_plan, write_plan
+from transaction_mirror import CLOCK_SKEW_MARGIN, TransactionMirror
+from transaction_stream import read_transactions_page
+from update_batches import JSON_HEADERS, plan_update_batches, print_batch_plan
 
 PROGRESS_FILE = "recategorise_progress.json"
+PROCESSED_SNAPSHOT_FILE = "recategorise_processed.ids"
+PROCESSED_LOG_FILE = "recategorise_processed.log"
+HEALTH_FILE = "recategorise_health.json"
+METRICS_BASENAME = "recategorise_metrics"  # .json and .prom
+PROFILE_BASENAME = "recategorise_profile"  # .pstats, .collapsed and _memory.json
+APPLY_CHUNK_SIZE = 500
+WATCH_MIN_INTERVAL = 30  # seconds between polls while transactions keep arriving
+WATCH_MAX_INTERVAL = 900  # idle polls back off (doubling) up to this
+PROVISION_WORKERS = 4  # concurrent category creations in the pre-flight stage
+
+checkpoint = CheckpointStore(PROGRESS_FILE, PROCESSED_SNAPSHOT_FILE, PROCESSED_LOG_FILE)
 
 
 def load_progress():
-    """Load progress from file"""
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
-    return {
-        "start_time": None,
-        "end_time": None,
-        "last_processed_page": 0,
-        "last_processed_transaction_id": 0,
-        "processed_transactions": [],
-        "created_categories": {},
-        "total_transactions_processed": 0,
-        "total_transactions_remapped": 0,
-        "unmapped_transactions": [],  # Transaction IDs that couldn't be remapped
-        "uncategorized_transactions": [],  # Transaction IDs with no category
-        "completed": False
-    }
+    """Load progress from the checkpoint store"""
+    state, processed_transactions = checkpoint.load()
+    if state is None:
+        state = {
+            "start_time": None,
+            "end_time": None,
+            "last_processed_page": 0,
+            "last_processed_transaction_id": 0,
+            "listing_started_at": None,  # When the current run's listing began, less CLOCK_SKEW_MARGIN
+            "oldest_failed_updated_at": None,  # Lowest updated_at of a failed update in the current run
+            "updated_since": None,  # Watermark for --incremental, set when a run completes
+            "created_categories": {},
+            "total_transactions_processed": 0,
+            "total_transactions_remapped": 0,
+            "completed": False
+        }
+    state["processed_transactions"] = processed_transactions
+    state.pop("newest_updated_at", None)  # watermark source of older versions
+    
+    # Why transactions were not remapped lives in the outcome ledger; fold in
+    # the ID lists kept in the state by older versions
+    outcomes = OutcomeLedger.load(OUTCOMES_FILE)
+    for key, reason in (("uncategorized_transactions", "uncategorized"), ("unmapped_transactions", "unmapped_category")):
+        for transaction_id in state.pop(key, []):
+            if transaction_id not in outcomes:
+                outcomes.record(transaction_id, reason)
+    state["outcomes"] = outcomes
+    return state
 
 
 def save_progress(progress):
-    """Save progress to file"""
+    """Checkpoint progress: append new processed IDs and outcomes, then rewrite the small state file"""
     progress["last_updated"] = datetime.now().isoformat()
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=2)
+    state = {key: value for key, value in progress.items() if key not in ("processed_transactions", "outcomes")}
+    with metrics.phase("checkpoint"):
+        progress["outcomes"].save()
+        checkpoint.save(state, progress["processed_transactions"])
 
 
-def get_or_create_category(client, user_id, category_name, progress):
-    """Get existing category ID or create new one"""
-    # Check if we already created this category
-    if category_name in progress["created_categories"]:
-        return progress["created_categories"][category_name]
-    
-    # Check if we can reuse an existing category with underscore prefix (from previous runs)
-    # Only reuse categories we've created (with underscore prefix), not original data categories
-    categories = client.categories.list_categories(user_id)
+def create_target_category(cache, category_name):
+    """Create one underscore-prefixed target category; returns its ID, or None on failure"""
+    # Add underscore prefix to avoid conflicts with existing categories
     target_name = f"_{category_name}"
-    for cat in categories:
-        if cat.title == target_name:
-            print(f"Found existing new category: {cat.title} (ID: {cat.id})")
-            progress["created_categories"][category_name] = cat.id
-            save_progress(progress)
-            return cat.id
-    
-    # Create new category using requests (based on API documentation)
     print(f"Creating new category: {category_name}")
     try:
-        import requests
-        
-        # Use direct requests call as shown in PocketSmith documentation
-        url = f"https://api.pocketsmith.com/v2/users/{user_id}/categories"
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "X-Developer-Key": client.api_client.configuration.api_key['developerKey']
-        }
-        # Add underscore prefix to avoid conflicts with existing categories
-        unique_name = f"_{category_name}"
-        data = {"title": unique_name}
-        
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code != 201:  # Not created
-            error_details = response.text
-            raise Exception(f"HTTP {response.status_code}: {error_details}")
-        response.raise_for_status()
-        
-        category_data = response.json()
-        category_id = category_data['id']
-        print(f"✅ Created category: {unique_name} (ID: {category_id})")
-        
+        # Create through the catalogue cache (write-through)
+        category_id = cache.create(target_name).id
     except Exception as e:
-        print(f"❌ Error creating category: {e}")
-        # For now, skip this transaction - we'll handle this better later
+        print(f"❌ Error creating category {target_name}: {e}")
         return None
-    
-    progress["created_categories"][category_name] = category_id
-    save_progress(progress)
+    print(f"✅ Created category: {target_name} (ID: {category_id})")
     return category_id
 
 
-def parse_link_header(link_header):
-    """Parse Link header to extract next/prev URLs"""
-    if not link_header:
-        return {}
+def provision_categories(client, user_id, progress, names=None):
+    """Pre-flight stage: make sure every target category exists before any update
+    
+    Targets (all new categories in CATEGORY_MAPPING unless names is given) are
+    reconciled against progress and the cached catalogue in one pass, and the
+    missing ones are created concurrently. Returns {category_name: category_id},
+    with None for categories that could not be created.
+    """
+    names = sorted(names) if names is not None else get_new_category_names()
+    created = progress["created_categories"]
+    cache = get_category_cache(client, user_id)
+    
+    resolved = {}
+    missing = []
+    new_ids = False
+    for name in names:
+        if name in created:
+            resolved[name] = created[name]
+            continue
+        # Only reuse categories we've created (with underscore prefix), not original data categories
+        existing = cache.find_by_title(f"_{name}")
+        if existing:
+            print(f"Found existing new category: {existing.title} (ID: {existing.id})")
+            resolved[name] = created[name] = existing.id
+            new_ids = True
+        else:
+            missing.append(name)
     
-    links = {}
-    for link in link_header.split(','):
-        link = link.strip()
-        if '; rel=' in link:
-            url_part, rel_part = link.split('; rel=', 1)
-            url = url_part.strip('<>')
-            rel = rel_part.strip('"')
-            links[rel] = url
-    return links
+    if missing:
+        print(f"Provisioning {len(missing)} new categories...")
+        with ThreadPoolExecutor(max_workers=min(len(missing), PROVISION_WORKERS)) as pool:
+            category_ids = list(pool.map(lambda name: create_target_category(cache, name), missing))
+        for name, category_id in zip(missing, category_ids):
+            resolved[name] = category_id
+            if category_id is not None:
+                created[name] = category_id
+                new_ids = True
+    
+    if new_ids:
+        save_progress(progress)
+    return resolved
 
 
-def get_transactions_page(client, user_id, page=1, per_page=1000):
-    """Get a page of transactions using pagination"""
+def get_transactions_page(client, user_id, page=1, per_page=1000, updated_since=None):
+    """Get a page of transactions using pagination, optionally only those updated since a time"""
     try:
-        # Use direct requests call since the underlying API client auth isn't working
-        import requests
-        
-        api_key = client.api_client.configuration.api_key['developerKey']
-        url = f"https://api.pocketsmith.com/v2/users/{user_id}/transactions"
-        headers = {
-            "accept": "application/json",
-            "X-Developer-Key": api_key
-        }
+        # Use direct REST call since the underlying API client auth isn't working
+        session = get_session(client)
         params = {'page': page, 'per_page': per_page}
+        if updated_since:
+            params['updated_since'] = updated_since
         
-        response = requests.get(url, headers=headers, params=params)
+        with metrics.phase("fetch"):  # until the response headers arrive
+            response = session.get(f"/users/{user_id}/transactions", params=params, stream=True)
         response.raise_for_status()
         
-        transactions_data = response.json()
+        # Stream-parse the page into Transaction records instead of response.json()
+        # (this also downloads the body, which is streamed)
+        with metrics.phase("decode"):
+            transactions_data = read_transactions_page(response)
         
-        # Convert to transaction objects manually - for now just return raw data
-        # The processing code will need to handle both dict and object formats
         link_header = response.headers.get('Link', '')
         links = parse_link_header(link_header)
         
@@ -153,171 +196,600 @@ def get_transactions_page(client, user_id, page=1, per_page=1000):
         # Fallback to basic method without pagination
         if page == 1:
             transactions = client.transactions.list_transactions(user_id)
-            return transactions, {}
+            return [Transaction.from_sdk(transaction) for transaction in transactions], {}
         else:
             return [], {}
 
 
 def is_transaction_processed(transaction_id, processed_transactions):
-    """Check if transaction is already processed using optimized search"""
-    # Convert to set for O(1) lookup if list is large
-    if len(processed_transactions) > 100:
-        # Use set for large lists - convert once and cache
-        if not hasattr(is_transaction_processed, '_processed_set'):
-            is_transaction_processed._processed_set = set(processed_transactions)
-        return transaction_id in is_transaction_processed._processed_set
-    
-    # For small lists, use the optimized linear search
-    # processed_transactions is in ascending order
-    for processed_id in processed_transactions:
-        if processed_id == transaction_id:
-            return True
-        elif processed_id > transaction_id:
-            # Since list is in ascending order, we can stop searching
-            break
-    return False
+    """Check if transaction is already processed (O(1) ProcessedIndex lookup)"""
+    return transaction_id in processed_transactions
 
 
-def process_transaction(client, user_id, transaction, progress):
-    """Process a single transaction for remapping"""
-    # Handle both dict and object formats for transaction
-    if isinstance(transaction, dict):
-        transaction_id = transaction['id']
-        transaction_payee = transaction['payee']
-        transaction_amount = transaction['amount']
-        transaction_date = transaction['date']
-        transaction_category = transaction.get('category')
-        transaction_labels = transaction.get('labels', [])
-    else:
-        transaction_id = transaction.id
-        transaction_payee = transaction.payee
-        transaction_amount = transaction.amount
-        transaction_date = transaction.date
-        transaction_category = transaction.category
-        transaction_labels = transaction.labels
-    
-    # Skip if already processed using optimized check
-    if is_transaction_processed(transaction_id, progress["processed_transactions"]):
-        return False, "already_processed"
+def compile_remap(client, user_id, progress, dry_run=False):
+    """Provision every target category (see provision_categories) and compile the remap table
+    
+    With dry_run, missing target categories are not created; their entries
+    carry the underscore-prefixed category name instead of an ID.
+    """
+    rules = load_rules()
+    if dry_run:
+        created = progress["created_categories"]
+        return compile_remap_table(lambda name: created.get(name, f"_{name}"), rules=rules)
+    return compile_remap_table(provision_categories(client, user_id, progress).get, rules=rules)
+
+
+def prepare_transaction_update(transaction, progress, remap, recheck=False):
+    """Decide how a single transaction (a records.Transaction) should be remapped
+    
+    remap is the RemapTable for this run (see compile_remap). With recheck
+    (the transaction was listed because it changed), an already processed
+    transaction is decided again unless it is in one of the new categories.
+    Returns (update, status). When no PUT is needed, update is None and the
+    transaction has already been recorded in progress. Otherwise update is a
+    dict with the transaction ID, the PUT payload and a display summary.
+    """
+    transaction_id = transaction.id
     
     # Check if transaction needs remapping
-    # Handle both dict and object formats for category
-    if transaction_category:
-        if isinstance(transaction_category, dict):
-            category_id = transaction_category.get('id')
-            category_title = transaction_category.get('title')
-        elif hasattr(transaction_category, 'id'):
-            category_id = transaction_category.id
-            category_title = transaction_category.title
-        else:
-            category_id = None
-            category_title = None
-    else:
-        category_id = None
-        category_title = None
+    transaction_category = transaction.category
+    category_id = transaction_category.id if transaction_category else None
+    category_title = transaction_category.title if transaction_category else None
     
-    if not transaction_category:
-        # Transaction has no category - record ID only
-        if transaction_id not in progress["uncategorized_transactions"]:
-            progress["uncategorized_transactions"].append(transaction_id)
-        # Add to processed list (will be sorted later for efficiency)
-        progress["processed_transactions"].append(transaction_id)
-        # Invalidate cached set
-        if hasattr(is_transaction_processed, '_processed_set'):
-            delattr(is_transaction_processed, '_processed_set')
-        return False, "uncategorized"
+    # Skip if already processed using optimized check - unless it changed and may
+    # have been moved into a mapped category since it was last decided
+    if is_transaction_processed(transaction_id, progress["processed_transactions"]):
+        if not recheck or (category_title or "").startswith('_'):
+            return None, "already_processed"
     
     # Skip transactions that already have underscore-prefixed categories (our new categories)
     if category_title and category_title.startswith('_'):
         # Transaction already has a new category - skip it
-        progress["processed_transactions"].append(transaction_id)
-        # Invalidate cached set
-        if hasattr(is_transaction_processed, '_processed_set'):
-            delattr(is_transaction_processed, '_processed_set')
-        return False, "already_remapped"
+        progress["outcomes"].record(transaction_id, "already_remapped")
+        progress["processed_transactions"].add(transaction_id)
+        return None, "already_remapped"
+    
+    # Payee rules take precedence over the category mapping
+    entry = remap.match_rules(transaction)
     
-    if category_id not in CATEGORY_MAPPING:
+    if entry is None and not transaction_category:
+        # Transaction has no category - record ID only
+        progress["outcomes"].record(transaction_id, "uncategorized")
+        # Add to processed list
+        progress["processed_transactions"].add(transaction_id)
+        return None, "uncategorized"
+    
+    if entry is None:
+        entry = remap.get(category_id)
+    if entry is None:
         # Category not in mapping - record ID only
-        if transaction_id not in progress["unmapped_transactions"]:
-            progress["unmapped_transactions"].append(transaction_id)
-        # Add to processed list (will be sorted later for efficiency)
-        progress["processed_transactions"].append(transaction_id)
-        # Invalidate cached set
-        if hasattr(is_transaction_processed, '_processed_set'):
-            delattr(is_transaction_processed, '_processed_set')
-        return False, "unmapped_category"
-    
-    old_category_id = category_id
-    mapping = CATEGORY_MAPPING[old_category_id]
-    new_category_name = mapping["new_category"]
-    label = mapping["label"]
+        progress["outcomes"].record(transaction_id, "unmapped_category")
+        # Add to processed list
+        progress["processed_transactions"].add(transaction_id)
+        return None, "unmapped_category"
+    
+    new_category_id, labels_to_add, new_category_name = entry
+    if new_category_id is None:
+        # Category creation failed - record it so the transaction can be found later
+        progress["outcomes"].record(transaction_id, "category_creation_failed", new_category_name)
+        # Add to processed list
+        progress["processed_transactions"].add(transaction_id)
+        return None, "category_creation_failed"
+    
+    # Prepare update data
+    update_data = {"category_id": new_category_id}
+    
+    # Add labels if specified
+    if labels_to_add:
+        update_data["labels"] = remap.merge_labels(transaction.labels, labels_to_add)
+    
+    summary = f"{(transaction.payee or '')[:50]} | {category_title or 'Uncategorized'} -> {new_category_name}" + (
+        f" +{','.join(sorted(labels_to_add))}" if labels_to_add else "")
+    return {"transaction_id": transaction_id, "data": update_data, "summary": summary}, "pending"
+
+
+def send_transaction_update(client, transaction_id, update_data, body=None):
+    """Send a transaction update using direct REST API, raising on failure
+    
+    body may carry the payload pre-encoded once for a whole update batch.
+    """
+    session = get_session(client)
+    if body is not None:
+        response = session.put(f"/transactions/{transaction_id}", data=body, headers=JSON_HEADERS)
+    else:
+        response = session.put(f"/transactions/{transaction_id}", json=update_data)
+    if response.status_code not in [200, 204]:  # Success codes for PUT
+        error_details = response.text
+        raise Exception(f"HTTP {response.status_code}: {error_details}")
+    response.raise_for_status()
+
+
+def record_transaction_update(progress, transaction_id):
+    """Mark a successfully updated transaction as processed and remapped"""
+    # Mark as processed - only new IDs are appended at the next checkpoint
+    progress["processed_transactions"].add(transaction_id)
+    progress["outcomes"].discard(transaction_id)  # clears an error from an earlier attempt
+    progress["total_transactions_remapped"] += 1
+
+
+def process_transaction(client, user_id, transaction, progress, remap, recheck=False):
+    """Process a single transaction for remapping"""
+    with metrics.phase("decide"):
+        update, status = prepare_transaction_update(transaction, progress, remap, recheck)
+    metrics.inc("transactions_decided_total", status=status)
+    if update is None:
+        return False, status
     
+    transaction_id = update["transaction_id"]
     try:
-        # Get or create new category
-        new_category_id = get_or_create_category(client, user_id, new_category_name, progress)
-        
-        if new_category_id is None:
-            # Category creation failed - record as unmapped
-            if transaction_id not in progress["unmapped_transactions"]:
-                progress["unmapped_transactions"].append(transaction_id)
-            # Add to processed list (will be sorted later for efficiency)
-            progress["processed_transactions"].append(transaction_id)
-            # Invalidate cached set
-            if hasattr(is_transaction_processed, '_processed_set'):
-                delattr(is_transaction_processed, '_processed_set')
-            return False, "category_creation_failed"
-        
-        # Prepare update data
-        update_data = {"category_id": new_category_id}
-        
-        # Add label if specified
-        if label:
-            current_labels = list(transaction_labels) if transaction_labels else []
-            if label not in current_labels:
-                current_labels.append(label)
-            update_data["labels"] = current_labels
-        
         # Update transaction using direct REST API
-        print(f"  Remapping transaction {transaction_id}: {transaction_payee[:50]} | {category_title} -> {new_category_name}" + (f" +{label}" if label else ""))
-        
-        import requests
-        url = f"https://api.pocketsmith.com/v2/transactions/{transaction_id}"
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "X-Developer-Key": client.api_client.configuration.api_key['developerKey']
-        }
-        
-        response = requests.put(url, headers=headers, json=update_data)
-        if response.status_code not in [200, 204]:  # Success codes for PUT
-            error_details = response.text
-            raise Exception(f"HTTP {response.status_code}: {error_details}")
-        response.raise_for_status()
-        
-        # Mark as processed - append for efficiency (will be sorted later)
-        progress["processed_transactions"].append(transaction_id)
-        # Invalidate cached set
-        if hasattr(is_transaction_processed, '_processed_set'):
-            delattr(is_transaction_processed, '_processed_set')
-        progress["total_transactions_remapped"] += 1
-        
-        # Rate limiting
-        time.sleep(0.1)
-        
+        print(f"  Remapping transaction {transaction_id}: {update['summary']}")
+        with metrics.phase("update"):
+            send_transaction_update(client, transaction_id, update["data"])
+        record_transaction_update(progress, transaction_id)
         return True, "remapped"
         
     except Exception as e:
         print(f"  ERROR updating transaction {transaction_id}: {e}")
+        progress["outcomes"].record(transaction_id, "error", str(e))
         return False, f"error: {e}"
 
 
+def process_transactions_concurrently(client, user_id, transactions, progress, executor, remap, recheck=False):
+    """Process a batch of transactions with PUTs running on a worker pool
+    
+    Decisions and progress bookkeeping stay on the calling thread; only the
+    HTTP updates run concurrently. Updates are grouped by identical payload
+    (see update_batches.py) so each group is encoded once and pipelined over
+    the pooled connections. Returns the number of transactions remapped.
+    """
+    updates = []
+    submitted = set()
+    statuses = {}
+    with metrics.phase("decide"):
+        for transaction in transactions:
+            update, status = prepare_transaction_update(transaction, progress, remap, recheck)
+            statuses[status] = statuses.get(status, 0) + 1
+            if update is None or update["transaction_id"] in submitted:
+                continue
+            submitted.add(update["transaction_id"])
+            print(f"  Remapping transaction {update['transaction_id']}: {update['summary']}")
+            updates.append(update)
+    for status, count in statuses.items():
+        metrics.inc("transactions_decided_total", count, status=status)
+    
+    remapped = 0
+    with metrics.phase("update"):
+        succeeded = send_update_batches(client, plan_update_batches(updates), executor, progress["outcomes"])
+    for transaction_id in succeeded:
+        record_transaction_update(progress, transaction_id)
+        remapped += 1
+    return remapped
+
+
+def send_update_batches(client, batches, executor=None, outcomes=None):
+    """Send planned update batches, serially or on a worker pool
+    
+    Failures are reported, recorded in the outcome ledger if one is given and
+    skipped. Returns the transaction IDs that were updated successfully.
+    """
+    succeeded = []
+    if executor is None:
+        for batch in batches:
+            for transaction_id in batch["transaction_ids"]:
+                try:
+                    send_transaction_update(client, transaction_id, batch["payload"], batch["body"])
+                except Exception as e:
+                    print(f"  ERROR updating transaction {transaction_id}: {e}")
+                    if outcomes is not None:
+                        outcomes.record(transaction_id, "error", str(e))
+                    continue
+                succeeded.append(transaction_id)
+        return succeeded
+    
+    pending = {}
+    for batch in batches:
+        for transaction_id in batch["transaction_ids"]:
+            future = executor.submit(send_transaction_update, client, transaction_id, batch["payload"], batch["body"])
+            pending[future] = transaction_id
+    
+    queued = len(pending)
+    metrics.set_gauge("update_queue_depth", queued)
+    for future in as_completed(pending):
+        transaction_id = pending[future]
+        queued -= 1
+        metrics.set_gauge("update_queue_depth", queued)
+        try:
+            future.result()
+        except Exception as e:
+            print(f"  ERROR updating transaction {transaction_id}: {e}")
+            if outcomes is not None:
+                outcomes.record(transaction_id, "error", str(e))
+            continue
+        succeeded.append(transaction_id)
+    return succeeded
+
+
+def plan_batches_dry_run(client, user_id, pages, progress, workers):
+    """Decide every pending update without sending it and report the batch plan
+    
+    Nothing is created, updated or checkpointed.
+    """
+    remap = compile_remap(client, user_id, progress, dry_run=True)
+    updates = []
+    for page, transactions, links in pages:
+        for transaction in transactions:
+            update, status = prepare_transaction_update(transaction, progress, remap)
+            if update is not None:
+                updates.append(update)
+    
+    category_names = {category_id: name for name, category_id in progress["created_categories"].items()}
+    return print_batch_plan(plan_update_batches(updates), workers=workers, category_names=category_names)
+
+
+def process_pages(client, user_id, pages, progress, executor=None, test_limit=None, remap=None,
+                  updated_since=None):
+    """Remap every transaction from an iterable of (page, transactions, links)
+    
+    Target categories are resolved (and created if needed) up front unless a
+    compiled remap is passed in. Progress is checkpointed once per page.
+    updated_since is the filter the pages were listed with, if any; only
+    unfiltered listings move the last_processed_page resume cursor, and
+    transactions in filtered listings are rechecked (see
+    prepare_transaction_update).
+    Returns the number of transactions (processed, remapped) in this call.
+    """
+    if remap is None:
+        remap = compile_remap(client, user_id, progress)
+    recheck = updated_since is not None
+    transactions_processed_this_run = 0
+    transactions_remapped_this_run = 0
+    
+    for page, transactions, links in pages:
+        print(f"\nFetched page {page}")
+        
+        if not transactions:
+            print("No more transactions found")
+            break
+        
+        print(f"Processing {len(transactions)} transactions from page {page}")
+        
+        # Sort transactions by ID in descending order (newest first)
+        transactions.sort(key=lambda t: t.id, reverse=True)
+        
+        page_remapped = 0
+        if executor:
+            # Respect the test limit before dispatching the page to the pool
+            if test_limit:
+                transactions = transactions[:test_limit - transactions_processed_this_run]
+            
+            # Count each transaction once across runs, not every time it is listed again
+            processed = progress["processed_transactions"]
+            progress["total_transactions_processed"] += sum(
+                not is_transaction_processed(transaction.id, processed) for transaction in transactions)
+            page_remapped = process_transactions_concurrently(client, user_id, transactions, progress, executor, remap,
+                                                              recheck)
+            transactions_remapped_this_run += page_remapped
+            transactions_processed_this_run += len(transactions)
+            
+            # Update last processed transaction ID for resume capability
+            for transaction in transactions:
+                progress["last_processed_transaction_id"] = min(
+                    progress["last_processed_transaction_id"], 
+                    transaction.id
+                )
+            
+            if test_limit and transactions_processed_this_run >= test_limit:
+                print(f"\n🧪 TEST LIMIT REACHED: Processed {transactions_processed_this_run} transactions")
+        else:
+            for transaction in transactions:
+            
+                if not is_transaction_processed(transaction.id, progress["processed_transactions"]):
+                    progress["total_transactions_processed"] += 1
+                transactions_processed_this_run += 1
+            
+                # Process the transaction
+                remapped, status = process_transaction(client, user_id, transaction, progress, remap, recheck)
+                if remapped:
+                    page_remapped += 1
+                    transactions_remapped_this_run += 1
+            
+                # Update last processed transaction ID for resume capability
+                progress["last_processed_transaction_id"] = min(
+                    progress["last_processed_transaction_id"], 
+                    transaction.id
+                )
+                        
+                # Test mode limit
+                if test_limit and transactions_processed_this_run >= test_limit:
+                    print(f"\n🧪 TEST LIMIT REACHED: Processed {transactions_processed_this_run} transactions")
+                    break
+        
+        # Failed updates must be listed again, so the next watermark may not pass them
+        outcomes = progress["outcomes"]
+        for transaction in transactions:
+            updated_at = transaction.updated_at
+            if updated_at and outcomes.reason(transaction.id) == "error":
+                oldest_failed = progress.get("oldest_failed_updated_at")
+                if oldest_failed is None or updated_at < oldest_failed:
+                    progress["oldest_failed_updated_at"] = updated_at
+        
+        # Update progress and save once per page (filtered listings have their own page numbering)
+        if updated_since is None:
+            progress["last_processed_page"] = page
+        save_progress(progress)
+        profiling.mark_page(page)
+        
+        print(f"Page {page} complete: {page_remapped} transactions remapped")
+        
+        # Test mode limit reached
+        if test_limit and transactions_processed_this_run >= test_limit:
+            break
+        
+        # Check if there's a next page
+        if 'next' not in links:
+            print("Reached last page of transactions")
+            break
+    pages.close()
+    
+    return transactions_processed_this_run, transactions_remapped_this_run
+
+
+def start_listing(progress):
+    """Note that a run's listing (or the mirror sync feeding it) starts now
+    
+    Anything changed after this, less CLOCK_SKEW_MARGIN, may be missing from
+    the listing, so that is as far as the next watermark can go.
+    """
+    started = datetime.now(timezone.utc) - CLOCK_SKEW_MARGIN
+    progress["listing_started_at"] = started.strftime('%Y-%m-%dT%H:%M:%SZ')
+    progress["oldest_failed_updated_at"] = None
+
+
+def next_watermark(progress):
+    """The --incremental watermark after a run: when its listing started, but never past a failed update"""
+    started = progress["listing_started_at"]
+    oldest_failed = progress.get("oldest_failed_updated_at")
+    if started and oldest_failed:
+        return min(started, oldest_failed)
+    return started
+
+
+def apply_plan(client, user_id, plan_path, progress, executor=None, chunk_size=APPLY_CHUNK_SIZE,
+               prefetch=DEFAULT_LOOKAHEAD):
+    """Apply a remap plan file written by --plan (see remap_plan.py)
+    
+    Each planned transaction is re-read from the freshly synced mirror, so
+    labels added since the plan was written are kept; transactions deleted or
+    moved to another category since then are skipped. Successfully updated
+    IDs are appended to <plan>.applied after each chunk, so an interrupted
+    apply resumes where it left off. Returns the number of transactions
+    remapped.
+    """
+    header, rows = read_plan(plan_path)
+    applied_path = f"{plan_path}.applied"
+    applied = set(read_ids(applied_path))
+    remaining = [row for row in rows if row[0] not in applied]
+    print(f"Plan {plan_path} (created {header['created_at']}): {len(rows)} changes, "
+          f"{len(rows) - len(remaining)} already applied, {len(remaining)} remaining")
+    
+    # Resolve every target category before sending any update
+    category_ids = provision_categories(client, user_id, progress, names={row[2] for row in remaining})
+    
+    mirror = TransactionMirror()
+    mirror.sync(client, user_id, prefetch=prefetch)
+    
+    remapped = 0
+    for start in range(0, len(remaining), chunk_size):
+        chunk = remaining[start:start + chunk_size]
+        current = {transaction.id: transaction for transaction in mirror.transactions_by_id(row[0] for row in chunk)}
+        updates = []
+        for transaction_id, old_category_id, new_category, label, labels in chunk:
+            if category_ids[new_category] is None:
+                print(f"  Skipping transaction {transaction_id}: category {new_category} could not be created")
+                continue
+            transaction = current.get(transaction_id)
+            if transaction is None or transaction.category_id != old_category_id:
+                print(f"  Skipping transaction {transaction_id}: deleted or recategorised since the plan was written")
+                continue
+            update_data = {"category_id": category_ids[new_category]}
+            if label:
+                labels = list(transaction.labels)
+                if label not in labels:
+                    labels.append(label)
+                update_data["labels"] = labels
+            updates.append({"transaction_id": transaction_id, "data": update_data})
+        
+        with metrics.phase("update"):
+            succeeded = send_update_batches(client, plan_update_batches(updates), executor, progress["outcomes"])
+        append_ids(applied_path, succeeded)
+        for transaction_id in succeeded:
+            record_transaction_update(progress, transaction_id)
+        save_progress(progress)
+        
+        remapped += len(succeeded)
+        profiling.mark_page(start // chunk_size + 1)
+        print(f"Applied {min(start + chunk_size, len(remaining))}/{len(remaining)} planned changes "
+              f"({remapped} remapped)")
+    
+    return remapped
+
+
+def classify_unmapped(client, user_id, progress, plan_path, model_id=None, prefetch=DEFAULT_LOOKAHEAD):
+    """Suggest categories for unmapped and uncategorized transactions and write them as a plan
+    
+    Transactions are taken from the outcome ledger and looked up in the local
+    mirror, then classified by payee (see payee_classifier.py). The result is
+    an ordinary plan file, so it can be reviewed before --apply. Returns the
+    classification stats.
+    """
+    mirror = TransactionMirror()
+    mirror.sync(client, user_id, prefetch=prefetch)
+    outcomes = progress["outcomes"]
+    transactions = [
+        transaction for transaction in mirror.transactions_by_id(
+            outcomes.ids("unmapped_category") + outcomes.ids("uncategorized"))
+        if not (transaction.category_title or "").startswith('_')
+    ]
+    print(f"{len(transactions)} unmapped or uncategorized transactions to classify")
+    
+    decisions, stats = classify_transactions(transactions, get_model(model_id), ClassificationCache())
+    rows = []
+    for transaction in transactions:
+        decision = decisions.get(transaction.id)
+        if decision is None:
+            continue
+        new_category, label = decision
+        labels = None
+        if label:
+            labels = list(transaction.labels)
+            if label not in labels:
+                labels.append(label)
+        rows.append([transaction.id, transaction.category_id, new_category, label, labels])
+    
+    write_plan(plan_path, rows)
+    print_plan_summary(rows)
+    print(f"\nClassified {stats['classified_transactions']} of {stats['transactions']} transactions "
+          f"({stats['payees']} payees, {stats['cached_payees']} from cache, {stats['prompts']} prompts)")
+    print(f"Model calls saved vs one per transaction: {stats['calls_saved_by_grouping']} by payee grouping, "
+          f"{stats['calls_saved_by_cache']} by the cache, {stats['calls_saved_by_batching']} by batching")
+    if stats['failed_payees']:
+        print(f"⚠️  {stats['failed_payees']} payees could not be classified this run and will be retried")
+    print(f"\nSuggestions written to {plan_path}. Review, then apply with: python recategorise.py --apply {plan_path}")
+    return stats
+
+
+def write_health(health):
+    """Write watch-mode health and throughput counters for external monitoring"""
+    uptime = time.time() - health["started"]
+    atomic_write_json(HEALTH_FILE, {
+        **{key: value for key, value in health.items() if key != "started"},
+        "uptime_seconds": round(uptime),
+        "remapped_per_hour": round(health["transactions_remapped"] * 3600 / uptime, 1) if uptime else 0.0,
+        "updated_at": datetime.now().isoformat(),
+    }, indent=2)
+
+
+def watch(client, user_id, progress, executor=None, use_mirror=True, prefetch=DEFAULT_LOOKAHEAD,
+          min_interval=WATCH_MIN_INTERVAL, max_interval=WATCH_MAX_INTERVAL):
+    """Poll for new or changed transactions and remap them until interrupted
+    
+    Each poll lists only transactions updated since the watermark (see
+    --incremental), so idle polls cost one small request. Listed transactions
+    that were seen before are decided again, so one moved into a mapped
+    category since is remapped. The interval resets to min_interval whenever
+    a poll finds transactions not seen before or remaps any, and doubles up
+    to max_interval otherwise. Progress is checkpointed after every
+    poll and health counters are written to HEALTH_FILE.
+    """
+    remap = compile_remap(client, user_id, progress)
+    mirror = TransactionMirror() if use_mirror else None
+    interval = min_interval
+    health = {
+        "started": time.time(),
+        "started_at": datetime.now().isoformat(),
+        "polls": 0,
+        "idle_polls": 0,
+        "errors": 0,
+        "last_error": None,
+        "last_poll": None,
+        "last_activity": None,
+        "poll_interval": interval,
+        "transactions_seen": 0,
+        "transactions_remapped": 0,
+        "updated_since": progress.get("updated_since"),
+    }
+    print(f"\n👀 WATCH MODE: polling every {min_interval}-{max_interval}s (Ctrl+C to stop)")
+    
+    try:
+        while True:
+            updated_since = progress.get("updated_since")
+            known = len(progress["processed_transactions"])
+            start_listing(progress)
+            try:
+                if mirror:
+                    mirror.sync(client, user_id, prefetch=prefetch)
+                    pages = mirror.iter_pages(per_page=1000, updated_since=updated_since)
+                else:
+                    pages = iter_pages(
+                        lambda page_number: get_transactions_page(
+                            client, user_id, page_number, per_page=1000, updated_since=updated_since),
+                        lookahead=prefetch,
+                    )
+                processed, remapped = process_pages(client, user_id, pages, progress, executor, remap=remap,
+                                                    updated_since=updated_since)
+                progress["updated_since"] = next_watermark(progress)
+                save_progress(progress)
+            except Exception as e:
+                processed = remapped = 0
+                health["errors"] += 1
+                health["last_error"] = f"{datetime.now().isoformat()}: {e}"
+                print(f"Poll failed: {e}")
+            
+            new_transactions = len(progress["processed_transactions"]) - known
+            health["polls"] += 1
+            health["last_poll"] = datetime.now().isoformat()
+            health["transactions_seen"] += new_transactions
+            health["transactions_remapped"] += remapped
+            health["updated_since"] = progress.get("updated_since")
+            if new_transactions or remapped:
+                health["last_activity"] = health["last_poll"]
+                interval = min_interval
+            else:
+                health["idle_polls"] += 1
+                interval = min(interval * 2, max_interval)
+            health["poll_interval"] = interval
+            write_health(health)
+            
+            print(f"Poll {health['polls']}: {new_transactions} new transactions, {remapped} remapped "
+                  f"({health['transactions_remapped']} total); next poll in {interval}s")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nWatch stopped")
+    finally:
+        save_progress(progress)
+        write_health(health)
+        if mirror:
+            mirror.close()
+    
+    return health
 
 
 def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Recategorise PocketSmith transactions')
     parser.add_argument('--test-limit', type=int, help='Test mode: limit processing to N transactions')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of concurrent transaction updates (default: 1, serial)')
+    parser.add_argument('--prefetch', type=int, default=DEFAULT_LOOKAHEAD,
+                       help=f'Number of transaction pages to fetch ahead (default: {DEFAULT_LOOKAHEAD})')
+    parser.add_argument('--no-mirror', action='store_true',
+                       help='Page through the API directly instead of syncing the local transaction mirror')
+    parser.add_argument('--since', metavar='WHEN',
+                       help='Only process transactions created or updated since WHEN (ISO date or timestamp)')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Only process transactions created or updated since the last completed run')
+    parser.add_argument('--watch', action='store_true',
+                       help='Keep running, polling for new or changed transactions and remapping them')
+    parser.add_argument('--poll-interval', type=int, default=WATCH_MIN_INTERVAL,
+                       help=f'Watch mode: seconds between polls while busy (default: {WATCH_MIN_INTERVAL}); '
+                            f'idle polls back off up to {WATCH_MAX_INTERVAL}s')
+    parser.add_argument('--profile', action='store_true',
+                       help=f'Profile the run (cProfile, stack samples, per-page memory) into {PROFILE_BASENAME}.*')
+    parser.add_argument('--classify', metavar='FILE',
+                       help='Classify unmapped/uncategorized transactions by payee with an LLM and write a plan to FILE')
+    parser.add_argument('--classify-model', metavar='MODEL',
+                       help='llm model ID for --classify, or "local" for the offline stand-in '
+                            '(default: $POCKETSMITH_CLASSIFY_MODEL or claude-3.5-haiku)')
+    parser.add_argument('--plan-batches', action='store_true',
+                       help='Dry run: report how pending updates group into batches without sending them')
+    parser.add_argument('--plan', metavar='FILE',
+                       help='Sync the local mirror and write the full set of intended changes to FILE')
+    parser.add_argument('--apply', metavar='FILE',
+                       help='Apply a plan file written by --plan (resumable)')
     args = parser.parse_args()
+    if args.classify and args.no_mirror:
+        parser.error("--classify looks transactions up in the local mirror and cannot be used with --no-mirror")
     
     # Get API key
     api_key = os.getenv('POCKETSMITH_API_KEY')
@@ -326,8 +798,13 @@ def main():
         print("Please set it with: export POCKETSMITH_API_KEY='your_api_key_here'")
         sys.exit(1)
     
-    # Initialize client
+    # Initialize client, sizing the connection pool to cover all workers and prefetches
     client = PocketsmithClient(api_key)
+    get_session(client, pool_size=max(args.workers + args.prefetch, DEFAULT_POOL_SIZE))
+    executor = ThreadPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    metrics.start_exporter(METRICS_BASENAME)
+    if args.profile:
+        profiling.start(PROFILE_BASENAME)
     
     try:
         # Get user info
@@ -342,86 +819,82 @@ def main():
         
         print(f"\nProgress: Processed {progress['total_transactions_processed']} transactions")
         print(f"Remapped: {progress['total_transactions_remapped']} transactions")
-        print(f"Unmapped: {len(progress.get('unmapped_transactions', []))} transactions")
-        print(f"Uncategorized: {len(progress.get('uncategorized_transactions', []))} transactions")
+        outcomes = progress["outcomes"]
+        print(f"Unmapped: {outcomes.count('unmapped_category')} transactions")
+        print(f"Uncategorized: {outcomes.count('uncategorized')} transactions")
+        print(f"Failed: {outcomes.count('error')} transactions")
         print(f"Last processed page: {progress['last_processed_page']}")
         print(f"Created categories: {list(progress['created_categories'].keys())}")
         
         if args.test_limit:
             print(f"\n🧪 TEST MODE: Processing up to {args.test_limit} transactions")
+        if executor:
+            print(f"Concurrent updates: {args.workers} workers")
+        
+        if args.plan:
+            mirror = TransactionMirror()
+            mirror.sync(client, user_id, prefetch=args.prefetch)
+            rows = build_plan(mirror, rules=load_rules())
+            write_plan(args.plan, rows)
+            print_plan_summary(rows)
+            print(f"\nPlan written to {args.plan}. Apply it with: python recategorise.py --apply {args.plan}")
+            return
+        
+        if args.classify:
+            classify_unmapped(client, user_id, progress, args.classify, args.classify_model, prefetch=args.prefetch)
+            return
+        
+        if args.apply:
+            remapped = apply_plan(client, user_id, args.apply, progress, executor, prefetch=args.prefetch)
+            print(f"\n🎉 PLAN APPLIED: {remapped} transactions remapped this run")
+            return
+        
+        if args.watch:
+            watch(client, user_id, progress, executor, use_mirror=not args.no_mirror, prefetch=args.prefetch,
+                  min_interval=args.poll_interval, max_interval=max(args.poll_interval, WATCH_MAX_INTERVAL))
+            return
+        
+        # Incremental runs only look at transactions changed since a watermark
+        updated_since = args.since
+        if args.incremental and not updated_since:
+            updated_since = progress.get("updated_since")
+            if not updated_since:
+                print("No watermark from a completed run yet - processing all transactions")
+        if updated_since:
+            print(f"Incremental run: transactions created or updated since {updated_since}")
+        start_listing(progress)
+        
+        # Start pagination from where we left off (incremental listings always start at page 1)
+        page = 1 if updated_since else max(1, progress["last_processed_page"])
+        
+        if args.no_mirror:
+            pages = iter_pages(
+                lambda page_number: get_transactions_page(
+                    client, user_id, page_number, per_page=1000, updated_since=updated_since),
+                start_page=page,
+                lookahead=args.prefetch,
+            )
+        else:
+            # Bring the local mirror up to date, then walk all of it - skipping
+            # already-processed transactions locally is cheap, and new transactions
+            # may sort onto earlier pages than last_processed_page
+            mirror = TransactionMirror()
+            mirror.sync(client, user_id, prefetch=args.prefetch)
+            pages = mirror.iter_pages(per_page=1000, updated_since=updated_since)
         
-        # Start pagination from where we left off
-        page = max(1, progress["last_processed_page"])
-        transactions_processed_this_run = 0
-        transactions_remapped_this_run = 0
+        if args.plan_batches:
+            plan_batches_dry_run(client, user_id, pages, progress, args.workers)
+            return
         
-        while True:
-            print(f"\nFetching page {page}...")
-            transactions, links = get_transactions_page(client, user_id, page, per_page=1000)
-            
-            if not transactions:
-                print("No more transactions found")
-                break
-            
-            print(f"Processing {len(transactions)} transactions from page {page}")
-            
-            # Sort transactions by ID in descending order (newest first)
-            if transactions and isinstance(transactions[0], dict):
-                transactions.sort(key=lambda t: t['id'], reverse=True)
-            else:
-                transactions.sort(key=lambda t: t.id, reverse=True)
-            
-            page_remapped = 0
-            for transaction in transactions:
-                
-                progress["total_transactions_processed"] += 1
-                transactions_processed_this_run += 1
-                
-                # Process the transaction
-                remapped, status = process_transaction(client, user_id, transaction, progress)
-                if remapped:
-                    page_remapped += 1
-                    transactions_remapped_this_run += 1
-                
-                # Update last processed transaction ID for resume capability
-                if isinstance(transaction, dict):
-                    current_id = transaction['id']
-                else:
-                    current_id = transaction.id
-                progress["last_processed_transaction_id"] = min(
-                    progress["last_processed_transaction_id"], 
-                    current_id
-                )
-                            
-                # Test mode limit
-                if args.test_limit and transactions_processed_this_run >= args.test_limit:
-                    print(f"\n🧪 TEST LIMIT REACHED: Processed {transactions_processed_this_run} transactions")
-                    break
-            
-            # Sort processed transactions for optimal search performance
-            progress["processed_transactions"].sort()
-            
-            # Update progress and save once per page
-            progress["last_processed_page"] = page
-            save_progress(progress)
-            
-            print(f"Page {page} complete: {page_remapped} transactions remapped")
-            
-            # Test mode limit reached
-            if args.test_limit and transactions_processed_this_run >= args.test_limit:
-                break
-            
-            # Check if there's a next page
-            if 'next' not in links:
-                print("Reached last page of transactions")
-                break
-            
-            page += 1
+        transactions_processed_this_run, transactions_remapped_this_run = process_pages(
+            client, user_id, pages, progress, executor, test_limit=args.test_limit, updated_since=updated_since)
         
         # Mark as completed if not in test mode
-        if not args.test_limit:
+        # (an incremental run only completes if everything before its watermark already was)
+        if not args.test_limit and (progress["completed"] or not updated_since):
             progress["completed"] = True
             progress["end_time"] = datetime.now().isoformat()
+            progress["updated_since"] = next_watermark(progress)
         
         save_progress(progress)
         
@@ -431,24 +904,26 @@ def main():
         print(f"Transactions remapped this run: {transactions_remapped_this_run}")
         print(f"Total transactions processed: {progress['total_transactions_processed']}")
         print(f"Total transactions remapped: {progress['total_transactions_remapped']}")
-        print(f"Unmapped transactions: {len(progress.get('unmapped_transactions', []))}")
-        print(f"Uncategorized transactions: {len(progress.get('uncategorized_transactions', []))}")
+        outcomes = progress["outcomes"]
+        print(f"Unmapped transactions: {outcomes.count('unmapped_category')}")
+        print(f"Uncategorized transactions: {outcomes.count('uncategorized')}")
+        print(f"Failed updates: {outcomes.count('error')}")
         print(f"Created categories: {list(progress['created_categories'].keys())}")
         
-        # Show details of unmapped transactions
-        if progress.get('unmapped_transactions'):
-            print(f"\n⚠️  Unmapped transaction IDs (category not in mapping):")
-            unmapped_ids = progress['unmapped_transactions'][:5]  # Show first 5
-            print(f"  - Transaction IDs: {', '.join(map(str, unmapped_ids))}")
-            if len(progress['unmapped_transactions']) > 5:
-                print(f"  ... and {len(progress['unmapped_transactions']) - 5} more")
-        
-        if progress.get('uncategorized_transactions'):
-            print(f"\n⚠️  Uncategorized transaction IDs (no category assigned):")
-            uncategorized_ids = progress['uncategorized_transactions'][:5]  # Show first 5
-            print(f"  - Transaction IDs: {', '.join(map(str, uncategorized_ids))}")
-            if len(progress['uncategorized_transactions']) > 5:
-                print(f"  ... and {len(progress['uncategorized_transactions']) - 5} more")
+        # Show the first few transaction IDs for each outcome that needs attention
+        for reason, heading in (
+            ("unmapped_category", "Unmapped transaction IDs (category not in mapping)"),
+            ("uncategorized", "Uncategorized transaction IDs (no category assigned)"),
+            ("category_creation_failed", "Transaction IDs whose target category could not be created"),
+            ("error", "Transaction IDs whose update failed (retried next run)"),
+        ):
+            count = outcomes.count(reason)
+            if not count:
+                continue
+            print(f"\n⚠️  {heading}:")
+            print(f"  - Transaction IDs: {', '.join(map(str, outcomes.ids(reason, limit=5)))}")
+            if count > 5:
+                print(f"  ... and {count - 5} more")
         
         if not args.test_limit and progress["completed"]:
             print("\n✅ All transactions have been processed!")
@@ -459,6 +934,12 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if executor:
+            executor.shutdown()
+        profiling.stop()
+        metrics.stop_exporter(METRICS_BASENAME)
+        metrics.print_summary()
 
 
 if __name__ == "__main__":
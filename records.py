@@ -0,0 +1,121 @@
+"""
+Transaction and Category Records
+
+Compact `__slots__` records that every script works with, whether the data
+came from the REST API (JSON dicts), the `pocketsmith` SDK (model objects)
+or the local mirror. Decoding happens once, at the edge, so the hot loops
+read plain attributes instead of branching on dict vs object per field.
+
+Memory notes for full-history scans:
+- slotted instances have no per-instance __dict__
+- Category records are interned, so transactions in the same category share
+  one instance
+- labels are stored as tuples (the empty tuple is a shared singleton)
+
+Records are treated as read-only once decoded.
+"""
+
+
+class Category:
+    __slots__ = ('id', 'title', 'is_transfer')
+
+    _interned = {}
+
+    def __init__(self, id, title=None, is_transfer=False):
+        self.id = id
+        self.title = title
+        self.is_transfer = is_transfer
+
+    @classmethod
+    def intern(cls, id, title, is_transfer):
+        key = (id, title, is_transfer)
+        category = cls._interned.get(key)
+        if category is None:
+            category = cls._interned[key] = cls(id, title, is_transfer)
+        return category
+
+    @classmethod
+    def from_api(cls, data):
+        """Decode an API category dict (None for no category)"""
+        if not data:
+            return None
+        return cls.intern(data.get('id'), data.get('title'), bool(data.get('is_transfer')))
+
+    @classmethod
+    def from_sdk(cls, category):
+        """Decode a pocketsmith SDK category object (None for no category)"""
+        if not category:
+            return None
+        return cls.intern(category.id, category.title, bool(getattr(category, 'is_transfer', False)))
+
+    def __eq__(self, other):
+        return isinstance(other, Category) and (self.id, self.title, self.is_transfer) == (
+            other.id, other.title, other.is_transfer)
+
+    def __hash__(self):
+        return hash((self.id, self.title, self.is_transfer))
+
+    def __repr__(self):
+        return f"Category(id={self.id!r}, title={self.title!r})"
+
+
+class Transaction:
+    __slots__ = ('id', 'payee', 'amount', 'date', 'category', 'labels', 'is_transfer', 'updated_at')
+
+    def __init__(self, id, payee=None, amount=None, date=None, category=None, labels=(),
+                 is_transfer=False, updated_at=None):
+        self.id = id
+        self.payee = payee
+        self.amount = amount
+        self.date = date
+        self.category = category
+        self.labels = labels
+        self.is_transfer = is_transfer
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_api(cls, data):
+        """Decode an API transaction dict"""
+        return cls(
+            data['id'],
+            data.get('payee'),
+            data.get('amount'),
+            data.get('date'),
+            Category.from_api(data.get('category')),
+            tuple(data.get('labels') or ()),
+            bool(data.get('is_transfer')),
+            data.get('updated_at'),
+        )
+
+    @classmethod
+    def from_sdk(cls, transaction):
+        """Decode a pocketsmith SDK transaction object"""
+        date = transaction.date
+        updated_at = getattr(transaction, 'updated_at', None)
+        return cls(
+            transaction.id,
+            transaction.payee,
+            transaction.amount,
+            date.isoformat() if hasattr(date, 'isoformat') else date,
+            Category.from_sdk(transaction.category),
+            tuple(transaction.labels or ()),
+            bool(getattr(transaction, 'is_transfer', False)),
+            updated_at.isoformat() if hasattr(updated_at, 'isoformat') else updated_at,
+        )
+
+    @property
+    def category_id(self):
+        return self.category.id if self.category else None
+
+    @property
+    def category_title(self):
+        return self.category.title if self.category else None
+
+    def __eq__(self, other):
+        return isinstance(other, Transaction) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Transaction(id={self.id!r}, payee={self.payee!r}, category={self.category!r})"
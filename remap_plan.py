@@ -0,0 +1,130 @@
+"""
+Remap Plan
+
+Splits recategorisation into two stages:
+- plan: compute every intended change from the local transaction mirror in a
+  single set-based SQL pass and write it to a compact plan file
+- apply: execute only the changes in a plan file (see recategorise.apply_plan)
+
+Because planning only reads the local mirror, tuning CATEGORY_MAPPING and
+re-planning is near-instant, and apply touches only what actually changes.
+Payee rules (payee_rules.py) win over the mapping, as in
+recategorise.prepare_transaction_update. They are matched against each
+distinct payee once; only rows with a matching payee are then selected (by a
+join in SQL) and checked against the rules' amount bounds in Python.
+
+Plan file format (JSON Lines):
+- line 1: header object with version, creation time and row count
+- each further line: [transaction_id, old_category_id, new_category, label, labels]
+  where label is the label to add (or null) and labels is the resulting label
+  list to send (null when the label list is left unchanged)
+"""
+
+import json
+from datetime import datetime
+
+from category_mapping import CATEGORY_MAPPING
+
+PLAN_VERSION = 1
+
+
+def build_plan(mirror, mapping=CATEGORY_MAPPING, rules=None):
+    """Compute remap rows for every mirrored transaction in a mapped old category
+    
+    rules is an optional payee_rules.RuleMatcher, applied before the mapping.
+    """
+    conn = mirror.conn
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS remap (old_category_id INTEGER PRIMARY KEY, "
+                 "new_category TEXT, label TEXT)")
+    conn.execute("DELETE FROM remap")
+    conn.executemany(
+        "INSERT INTO remap (old_category_id, new_category, label) VALUES (?, ?, ?)",
+        [(old_id, entry["new_category"], entry["label"]) for old_id, entry in mapping.items()],
+    )
+    cursor = conn.execute(
+        "SELECT t.id, t.category_id, r.new_category, r.label, t.labels "
+        "FROM transactions t JOIN remap r ON r.old_category_id = t.category_id "
+        "WHERE t.category_title IS NULL OR t.category_title NOT LIKE '\\_%' ESCAPE '\\' "
+        "ORDER BY t.id"
+    )
+    rows = [_plan_row(*row) for row in cursor]
+    if rules is None:
+        return rows
+
+    rule_rows = _rule_rows(conn, rules)
+    if not rule_rows:
+        return rows
+    rows = [row for row in rows if row[0] not in rule_rows]
+    rows.extend(rule_rows.values())
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def _rule_rows(conn, rules):
+    """{transaction id: plan row} for mirrored transactions matched by a payee rule"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS rule_payees (payee TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM rule_payees")
+    conn.executemany(
+        "INSERT INTO rule_payees (payee) VALUES (?)",
+        [(payee,) for (payee,) in conn.execute("SELECT DISTINCT payee FROM transactions WHERE payee IS NOT NULL")
+         if rules.candidates(payee)],
+    )
+    cursor = conn.execute(
+        "SELECT t.id, t.category_id, t.payee, t.amount, t.labels "
+        "FROM transactions t JOIN rule_payees p ON p.payee = t.payee "
+        "WHERE t.category_title IS NULL OR t.category_title NOT LIKE '\\_%' ESCAPE '\\'"
+    )
+    rule_rows = {}
+    for transaction_id, old_category_id, payee, amount, labels_json in cursor:
+        index = rules.match(payee, amount)
+        if index is not None:
+            rule = rules.rules[index]
+            rule_rows[transaction_id] = _plan_row(transaction_id, old_category_id, rule.category, rule.label,
+                                                  labels_json)
+    return rule_rows
+
+
+def _plan_row(transaction_id, old_category_id, new_category, label, labels_json):
+    labels = None
+    if label:
+        labels = json.loads(labels_json) if labels_json else []
+        if label not in labels:
+            labels.append(label)
+    return [transaction_id, old_category_id, new_category, label, labels]
+
+
+def write_plan(path, rows):
+    header = {
+        "version": PLAN_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "transactions": len(rows),
+    }
+    with open(path, 'w') as f:
+        f.write(json.dumps(header) + "\n")
+        for row in rows:
+            f.write(json.dumps(row, separators=(',', ':')) + "\n")
+
+
+def read_plan(path):
+    """Return (header, rows) from a plan file"""
+    with open(path, 'r') as f:
+        header = json.loads(f.readline())
+        if header.get("version") != PLAN_VERSION:
+            raise ValueError(f"Unsupported plan version: {header.get('version')}")
+        rows = [json.loads(line) for line in f if line.strip()]
+    return header, rows
+
+
+def summarize_plan(rows):
+    """Count planned changes per target category and label"""
+    summary = {}
+    for _, _, new_category, label, _ in rows:
+        key = (new_category, label)
+        summary[key] = summary.get(key, 0) + 1
+    return summary
+
+
+def print_plan_summary(rows):
+    print(f"\n=== REMAP PLAN: {len(rows)} transactions to update ===")
+    for (new_category, label), count in sorted(summarize_plan(rows).items(), key=lambda item: -item[1]):
+        print(f"  {count:>6} -> {new_category}" + (f" +{label}" if label else ""))
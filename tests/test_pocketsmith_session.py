@@ -0,0 +1,61 @@
+"""Connection reuse of the shared PocketSmith session against a local stub server"""
+
+import os
+import sys
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+from fake_pocketsmith import FakePocketsmith, make_handler
+from pocketsmith_session import get_session
+
+
+class CountingServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that counts accepted TCP connections"""
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+
+    def get_request(self):
+        request = super().get_request()
+        self.connections += 1
+        return request
+
+
+class SessionReuseTest(unittest.TestCase):
+    def setUp(self):
+        self.server = CountingServer(("127.0.0.1", 0), make_handler(FakePocketsmith(100)))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/v2"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_calls_share_one_connection(self):
+        client = SimpleNamespace(api_client=SimpleNamespace(
+            configuration=SimpleNamespace(api_key={'developerKey': 'session-reuse-test'})))
+        session = get_session(client, base_url=self.base_url)
+        self.addCleanup(session.close)
+
+        self.assertEqual(session.get("/me").status_code, 200)
+        for page in range(1, 4):
+            response = session.get("/users/1/transactions", params={"page": page, "per_page": 10})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(session.put("/transactions/300000001", json={"labels": ["test"]}).status_code, 200)
+        self.assertEqual(session.get("/users/1/categories").status_code, 200)
+
+        self.assertIs(get_session(client), session)
+        self.assertEqual(self.server.connections, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""AIMD behaviour of the shared AdaptiveRateLimiter"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import AdaptiveRateLimiter
+
+
+class ThrottleEpisodeTest(unittest.TestCase):
+    def test_concurrent_throttles_decrease_once(self):
+        limiter = AdaptiveRateLimiter(rate=10.0)
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            limiter.on_throttle(0.2)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(limiter.rate, 5.0)
+        self.assertEqual(limiter.throttle_count, 8)
+        self.assertEqual(limiter.consecutive_throttles, 1)
+
+    def test_throttle_after_pause_decreases_again(self):
+        limiter = AdaptiveRateLimiter(rate=10.0)
+        limiter.on_throttle(0.05)
+        time.sleep(0.3)  # past the pause and one refill interval at 5 req/s
+        limiter.on_throttle(0.05)
+        self.assertEqual(limiter.rate, 2.5)
+
+    def test_longer_retry_after_extends_pause(self):
+        limiter = AdaptiveRateLimiter(rate=10.0)
+        limiter.on_throttle(0.1)
+        limiter.on_throttle(5.0)
+        self.assertEqual(limiter.rate, 5.0)
+        self.assertGreater(limiter.paused_until - time.monotonic(), 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Incremental remapping of transactions that change after they were decided"""
+
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import recategorise
+from fake_pocketsmith import BASE_TRANSACTION_ID, FakePocketsmith, now_iso, start_server
+from pagination import iter_pages
+
+USER_ID = 1
+PER_PAGE = 50
+UNCATEGORIZED_ID = BASE_TRANSACTION_ID  # the fake leaves every 17th transaction uncategorised
+EATING_OUT = 7312544  # mapped to Dining +restaurants
+
+
+class IncrementalRecheckTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(directory.name)  # progress, ledger and category cache files are written to the working directory
+        self.addCleanup(os.chdir, cwd)
+
+        self.api = FakePocketsmith(100)
+        server, base_url = start_server(self.api)
+        self.addCleanup(server.shutdown)
+        os.environ['POCKETSMITH_API_BASE_URL'] = base_url
+        self.addCleanup(os.environ.pop, 'POCKETSMITH_API_BASE_URL')
+
+        # A distinct key per test gets a fresh pooled session and category cache
+        self.client = SimpleNamespace(api_client=SimpleNamespace(
+            configuration=SimpleNamespace(api_key={'developerKey': f"recategorise-test-{id(self)}"})))
+        self.progress = recategorise.load_progress()
+
+    def run_pages(self, updated_since=None):
+        pages = iter_pages(
+            lambda page: recategorise.get_transactions_page(
+                self.client, USER_ID, page, per_page=PER_PAGE, updated_since=updated_since),
+            lookahead=0,
+        )
+        return recategorise.process_pages(self.client, USER_ID, pages, self.progress, updated_since=updated_since)
+
+    def test_changed_transaction_is_decided_again(self):
+        self.run_pages()
+        self.assertEqual(self.progress["outcomes"].reason(UNCATEGORIZED_ID), "uncategorized")
+
+        moved_at = now_iso()
+        self.api.update_transaction(UNCATEGORIZED_ID, {"category_id": EATING_OUT})
+        processed, remapped = self.run_pages(updated_since=moved_at)
+
+        self.assertEqual(remapped, 1)
+        self.assertIsNone(self.progress["outcomes"].reason(UNCATEGORIZED_ID))
+        self.assertEqual(self.api.current_category_id(UNCATEGORIZED_ID - BASE_TRANSACTION_ID),
+                         self.progress["created_categories"]["Dining"])
+
+    def test_remapped_transaction_is_not_sent_again(self):
+        started = now_iso()
+        _, remapped = self.run_pages()
+        self.assertGreater(remapped, 0)
+
+        # Every remap bumped updated_at, so all of them are listed again
+        _, remapped = self.run_pages(updated_since=started)
+        self.assertEqual(remapped, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Incremental sync of the local transaction mirror against the fake API"""
+
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+from fake_pocketsmith import BASE_TRANSACTION_ID, FakePocketsmith, start_server
+from transaction_mirror import TransactionMirror
+
+USER_ID = 1
+PER_PAGE = 10
+
+
+class EditingFakePocketsmith(FakePocketsmith):
+    """Fake API that runs a callback once, just before serving a given page"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.before_page = {}
+
+    def list_transactions(self, page, per_page, updated_since=None, category_id=None):
+        callback = self.before_page.pop(page, None)
+        if callback:
+            callback()
+        return super().list_transactions(page, per_page, updated_since, category_id)
+
+
+class MirrorSyncTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(directory.name)  # the category cache file is written to the working directory
+        self.addCleanup(os.chdir, cwd)
+
+        self.api = EditingFakePocketsmith(100)
+        server, base_url = start_server(self.api)
+        self.addCleanup(server.shutdown)
+        os.environ['POCKETSMITH_API_BASE_URL'] = base_url
+        self.addCleanup(os.environ.pop, 'POCKETSMITH_API_BASE_URL')
+
+        # A distinct key per test gets a fresh pooled session and category cache
+        self.client = SimpleNamespace(api_client=SimpleNamespace(
+            configuration=SimpleNamespace(api_key={'developerKey': f"mirror-test-{id(self)}"})))
+        self.mirror = TransactionMirror(os.path.join(directory.name, "transactions.db"))
+        self.addCleanup(self.mirror.conn.close)
+
+    def sync(self):
+        return self.mirror.sync(self.client, USER_ID, per_page=PER_PAGE, prefetch=0)
+
+    def labels(self, index):
+        return self.mirror.transactions_by_id([BASE_TRANSACTION_ID + index])[0].labels
+
+    def test_row_edited_during_sync_is_picked_up_next_sync(self):
+        self.sync()
+        # 30 changed rows: the incremental listing is 3 pages, newest transaction IDs first
+        for index in range(30):
+            self.api.update_transaction(BASE_TRANSACTION_ID + index, {"labels": ["before"]})
+
+        def edit_during_sync():
+            # Lands on page 1, which has already been fetched...
+            self.api.update_transaction(BASE_TRANSACTION_ID + 29, {"labels": ["edited"]})
+            # ...while a row still to come is updated after it
+            self.api.update_transaction(BASE_TRANSACTION_ID + 0, {"labels": ["later"]})
+
+        self.api.before_page[2] = edit_during_sync
+        self.sync()
+        self.assertEqual(self.labels(29), ("before",))
+        self.assertEqual(self.labels(0), ("later",))
+
+        self.sync()
+        self.assertEqual(self.labels(29), ("edited",))
+
+    def test_mirror_for_another_user_is_rebuilt(self):
+        self.sync()
+        self.mirror.conn.execute("UPDATE transactions SET id = 1 WHERE id = ?", (BASE_TRANSACTION_ID,))
+        self.mirror.set_state('user_id', str(USER_ID + 1))
+        self.sync()
+        self.assertEqual(self.mirror.get_state('user_id'), str(USER_ID))
+        self.assertEqual(self.mirror.transactions_by_id([1]), [])
+        self.assertEqual(self.mirror.transaction_count(), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,259 @@
+"""
+Local Transaction Mirror
+
+This module keeps a local SQLite copy of PocketSmith transactions and
+categories so scripts can query history without re-paginating the API on
+every run.
+
+The mirror is kept current by incremental sync: only transactions updated
+since the last sync watermark are fetched, using the API's `updated_since`
+filter. The watermark is the time the previous sync started, less
+CLOCK_SKEW_MARGIN, not the newest `updated_at` seen: pages are fetched
+concurrently by offset, so rows edited on a page already fetched, or shifted
+between pages while the sync ran, may be missed by one sync and must be
+picked up by the next. Updates made by recategorise.py bump `updated_at` on
+the server, so the next sync picks them up automatically.
+
+Transactions deleted on the server are not removed from the mirror, and a
+delete during the first (offset-paged) sync can shift an unedited row past
+the pages being fetched, so it is never mirrored. Usage counts derived from
+the mirror can therefore be wrong in either direction; category cleanup
+confirms each empty category against the live API before deleting it.
+
+The mirror records the user it was built for and is rebuilt from scratch if
+synced for a different user.
+"""
+
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from category_cache import flatten_categories, get_category_cache
+from metrics import metrics
+from pagination import DEFAULT_LOOKAHEAD, iter_pages, parse_link_header
+from pocketsmith_session import get_session
+from records import Category, Transaction
+from transaction_stream import read_transactions_page
+
+MIRROR_FILE = "transactions.db"
+CLOCK_SKEW_MARGIN = timedelta(minutes=5)  # allowance for server/local clock differences
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    payee TEXT,
+    amount REAL,
+    date TEXT,
+    category_id INTEGER,
+    category_title TEXT,
+    labels TEXT,
+    is_transfer INTEGER,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_category_id ON transactions (category_id);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS transactions_updated_at ON transactions (updated_at);
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    parent_id INTEGER,
+    is_transfer INTEGER,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class TransactionMirror:
+    """SQLite-backed mirror of a user's transactions and categories"""
+
+    def __init__(self, path=MIRROR_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # Sync state
+
+    def get_state(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key, value):
+        self.conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    # Writes
+
+    def upsert_transactions(self, transactions):
+        """Insert or replace Transaction records"""
+        rows = []
+        for transaction in transactions:
+            category = transaction.category
+            rows.append((
+                transaction.id,
+                transaction.payee,
+                transaction.amount,
+                transaction.date,
+                category.id if category else None,
+                category.title if category else None,
+                json.dumps(transaction.labels),
+                1 if transaction.is_transfer else 0,
+                transaction.updated_at,
+            ))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO transactions "
+            "(id, payee, amount, date, category_id, category_title, labels, is_transfer, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        return len(rows)
+
+    def reset(self):
+        """Drop all mirrored data and sync state"""
+        self.conn.execute("DELETE FROM transactions")
+        self.conn.execute("DELETE FROM categories")
+        self.conn.execute("DELETE FROM sync_state")
+
+    def replace_categories(self, categories):
+        """Replace the category catalogue with the given API dicts"""
+        self.conn.execute("DELETE FROM categories")
+        self.conn.executemany(
+            "INSERT INTO categories (id, title, parent_id, is_transfer, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (c['id'], c.get('title'), c.get('parent_id'), 1 if c.get('is_transfer') else 0, c.get('updated_at'))
+                for c in flatten_categories(categories)
+            ],
+        )
+
+    # Sync
+
+    def sync(self, client, user_id, per_page=1000, prefetch=DEFAULT_LOOKAHEAD):
+        """Fetch categories and any transactions updated since the last sync"""
+        session = get_session(client)
+        started = datetime.now(timezone.utc)
+        mirrored_user = self.get_state('user_id')
+        if mirrored_user != str(user_id) and (mirrored_user is not None or self.transaction_count()):
+            print(f"Mirror {self.path} was built for another user; rebuilding it")
+            self.reset()
+        self.set_state('user_id', str(user_id))
+        self.replace_categories(get_category_cache(client, user_id).raw())
+
+        watermark = self.get_state('updated_since')
+        params = {'per_page': per_page}
+        if watermark:
+            params['updated_since'] = watermark
+            print(f"Syncing transactions updated since {watermark}...")
+        else:
+            print("Building local transaction mirror (first sync)...")
+
+        def fetch_page(page):
+            with metrics.phase("fetch"):
+                page_response = session.get(f"/users/{user_id}/transactions", params={**params, 'page': page},
+                                            stream=True)
+            page_response.raise_for_status()
+            with metrics.phase("decode"):
+                transactions = read_transactions_page(page_response)
+            return transactions, parse_link_header(page_response.headers.get('Link', ''))
+
+        synced = 0
+        for page, transactions, links in iter_pages(fetch_page, lookahead=prefetch):
+            synced += self.upsert_transactions(transactions)
+
+        self.set_state('updated_since', (started - CLOCK_SKEW_MARGIN).strftime('%Y-%m-%dT%H:%M:%SZ'))
+        self.set_state('last_synced', datetime.now().isoformat())
+        self.conn.commit()
+        print(f"Mirror sync complete: {synced} transactions updated, {self.transaction_count()} total")
+        return synced
+
+    # Queries
+
+    def _row_to_transaction(self, row):
+        transaction_id, payee, amount, date, category_id, category_title, labels, is_transfer, updated_at = row
+        return Transaction(
+            transaction_id,
+            payee,
+            amount,
+            date,
+            Category.intern(category_id, category_title, False) if category_id else None,
+            tuple(json.loads(labels)) if labels and labels != '[]' else (),
+            bool(is_transfer),
+            updated_at,
+        )
+
+    def _select(self, where="", params=(), limit=None, offset=None):
+        sql = ("SELECT id, payee, amount, date, category_id, category_title, labels, is_transfer, updated_at "
+               f"FROM transactions {where} ORDER BY date DESC, id DESC")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+            if offset:
+                sql += f" OFFSET {int(offset)}"
+        return [self._row_to_transaction(row) for row in self.conn.execute(sql, params)]
+
+    def transaction_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def iter_pages(self, per_page=1000, start_page=1, updated_since=None):
+        """Yield (page, transactions, links) like the paginated API, from the mirror
+
+        With updated_since, only transactions whose updated_at is at or after it
+        are listed (the API's updated_since filter).
+        """
+        where, params = ("WHERE updated_at >= ?", (updated_since,)) if updated_since else ("", ())
+        count = self.conn.execute(f"SELECT COUNT(*) FROM transactions {where}", params).fetchone()[0]
+        last_page = max(1, -(-count // per_page))
+        for page in range(start_page, last_page + 1):
+            transactions = self._select(where, params, limit=per_page, offset=(page - 1) * per_page)
+            links = {'last': f"?page={last_page}"}
+            if page < last_page:
+                links['next'] = f"?page={page + 1}"
+            yield page, transactions, links
+
+    def transactions_by_id(self, transaction_ids, chunk_size=500):
+        """Return the mirrored transactions with the given IDs (missing IDs are skipped)"""
+        transaction_ids = list(transaction_ids)
+        transactions = []
+        for start in range(0, len(transaction_ids), chunk_size):
+            chunk = transaction_ids[start:start + chunk_size]
+            transactions += self._select(f"WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        return transactions
+
+    def sample_categories(self, category_ids, limit=3):
+        """Return ({category_id: newest `limit` transactions}, {category_id: count}) in two queries"""
+        category_ids = list(category_ids)
+        placeholders = ", ".join("?" * len(category_ids))
+        counts = {category_id: 0 for category_id in category_ids}
+        counts.update(self.conn.execute(
+            f"SELECT category_id, COUNT(*) FROM transactions WHERE category_id IN ({placeholders}) "
+            "GROUP BY category_id", category_ids
+        ).fetchall())
+
+        samples = {category_id: [] for category_id in category_ids}
+        rows = self.conn.execute(
+            "SELECT id, payee, amount, date, category_id, category_title, labels, is_transfer, updated_at FROM ("
+            "SELECT *, ROW_NUMBER() OVER (PARTITION BY category_id ORDER BY date DESC, id DESC) AS position "
+            f"FROM transactions WHERE category_id IN ({placeholders})) "
+            "WHERE position <= ? ORDER BY category_id, position", [*category_ids, int(limit)]
+        )
+        for row in rows:
+            samples[row[4]].append(self._row_to_transaction(row))
+        return samples, counts
+
+    def category_usage(self):
+        """Return (category_id, title, is_transfer, transaction_count, total_amount, first_date, last_date)
+        for categories in use"""
+        return self.conn.execute(
+            "SELECT t.category_id, COALESCE(c.title, MAX(t.category_title)), COALESCE(c.is_transfer, 0), COUNT(*), "
+            "ROUND(SUM(t.amount), 2), MIN(t.date), MAX(t.date) "
+            "FROM transactions t LEFT JOIN categories c ON c.id = t.category_id "
+            "WHERE t.category_id IS NOT NULL GROUP BY t.category_id"
+        ).fetchall()
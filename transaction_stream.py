@@ -0,0 +1,107 @@
+"""
+Streaming Transaction Page Reader
+
+Transaction pages of 1000 items are around a megabyte of JSON, and
+`response.json()` materialises the whole body plus every nested object
+(category trees, transaction accounts, institution details) before any of it
+is used. This module parses the response body incrementally, one array
+element at a time, and decodes each one straight into a compact
+records.Transaction holding only the fields the scripts read: id, payee,
+amount, date, category (id, title, is_transfer), labels, is_transfer and
+updated_at.
+"""
+
+import codecs
+import json
+
+from records import Transaction
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = ",]" + _WHITESPACE
+
+
+def iter_json_array(chunks):
+    """Yield the elements of a top-level JSON array from an iterable of byte chunks
+
+    Only the current element (plus at most one unread chunk) is held in
+    memory at a time.
+    """
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ""
+    pos = 0
+    exhausted = False
+
+    def more():
+        nonlocal buffer, pos, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer = buffer[pos:] + utf8.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or exhausted:
+                return
+            more()
+
+    skip_whitespace()
+    if pos >= len(buffer):
+        return
+    if buffer[pos] != '[':
+        raise ValueError(f"Expected a JSON array, got {buffer[pos:pos + 20]!r}")
+    pos += 1
+
+    expect_value = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        char = buffer[pos]
+        if char == ']':
+            return
+        if char == ',' and not expect_value:
+            pos += 1
+            expect_value = True
+            continue
+        if not expect_value:
+            raise ValueError(f"Expected ',' or ']' in JSON array, got {buffer[pos:pos + 20]!r}")
+
+        # Decode the next element, reading more input while it is incomplete.
+        # A value cut at the buffer edge may still decode (e.g. "-12" of
+        # "-12.5"), so it is only accepted once a delimiter follows it.
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+                if exhausted or (end < len(buffer) and buffer[end] in _DELIMITERS):
+                    break
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            more()
+        pos = end
+        expect_value = False
+        yield value
+
+
+def stream_transactions(response, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield Transaction records from a streamed (stream=True) response"""
+    try:
+        for transaction in iter_json_array(response.iter_content(chunk_size)):
+            yield Transaction.from_api(transaction)
+    finally:
+        response.close()
+
+
+def read_transactions_page(response, chunk_size=STREAM_CHUNK_SIZE):
+    """Parse a streamed transactions page into a list of Transaction records"""
+    return list(stream_transactions(response, chunk_size))
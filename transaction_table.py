@@ -0,0 +1,129 @@
+"""
+Columnar Transaction Table
+
+Holds the categorised transactions needed for usage analysis as parallel
+typed columns instead of one object per row:
+- category_id, amount, date ordinal (0 = unknown)
+
+The table is filled while paging (`extend` per page, in a single pass that
+skips uncategorised transactions) at 20 bytes per transaction, and analysis
+runs as group-bys over whole columns.
+
+NumPy is a project dependency: the columns are viewed as NumPy arrays
+without copying and group-bys are vectorised (argsort + reduceat). If it is
+missing (e.g. running outside the locked environment), per-category stats
+fall back to a plain loop, which is several times slower.
+"""
+
+from array import array
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NO_DATE = 0
+
+
+class TransactionTable:
+    """Column store for the categorised records.Transaction rows of a usage scan"""
+
+    def __init__(self):
+        self.category_ids = array('q')
+        self.amounts = array('d')
+        self.dates = array('i')
+
+        self.transaction_count = 0  # every transaction added, categorised or not
+        self.categories = {}  # category id -> Category record seen in the data
+        self._date_ordinals = {}
+
+    def __len__(self):
+        return self.transaction_count
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        table = cls()
+        table.extend(transactions)
+        return table
+
+    # Building
+
+    def extend(self, transactions):
+        """Append a page (a list) of transactions in one pass"""
+        categories = self.categories
+        date_ordinals = self._date_ordinals
+        category_ids, amounts, dates = [], [], []
+        add_category_id, add_amount, add_date = category_ids.append, amounts.append, dates.append
+        for transaction in transactions:
+            category = transaction.category
+            if category is None:
+                continue
+            category_id = category.id
+            if not category_id:
+                continue
+            if category_id not in categories:
+                categories[category_id] = category
+            add_category_id(category_id)
+            add_amount(transaction.amount or 0.0)
+            value = transaction.date
+            if value in date_ordinals:
+                add_date(date_ordinals[value])
+            else:
+                ordinal = date_ordinals[value] = date.fromisoformat(value[:10]).toordinal() if value else NO_DATE
+                add_date(ordinal)
+
+        self.transaction_count += len(transactions)
+        self.category_ids.fromlist(category_ids)
+        self.amounts.fromlist(amounts)
+        self.dates.fromlist(dates)
+
+    # Analysis
+
+    def category_stats(self):
+        """Return {category_id: {count, total_amount, first_date, last_date}}"""
+        if not len(self.category_ids):
+            return {}
+        if np is not None:
+            return self._category_stats_numpy()
+
+        stats = {}
+        for category_id, amount, ordinal in zip(self.category_ids, self.amounts, self.dates):
+            entry = stats.get(category_id)
+            if entry is None:
+                stats[category_id] = [1, amount, ordinal, ordinal]
+            else:
+                entry[0] += 1
+                entry[1] += amount
+                if ordinal < entry[2]:
+                    entry[2] = ordinal
+                if ordinal > entry[3]:
+                    entry[3] = ordinal
+        return {category_id: self._stats_entry(*entry) for category_id, entry in stats.items()}
+
+    def _category_stats_numpy(self):
+        category_ids = np.frombuffer(self.category_ids, dtype=np.int64)
+        order = np.argsort(category_ids, kind='stable')
+        sorted_ids = category_ids[order]
+        amounts = np.frombuffer(self.amounts, dtype=np.float64)[order]
+        dates = np.frombuffer(self.dates, dtype=np.int32)[order]
+
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        counts = np.diff(np.r_[starts, len(sorted_ids)])
+        totals = np.add.reduceat(amounts, starts)
+        first = np.minimum.reduceat(dates, starts)
+        last = np.maximum.reduceat(dates, starts)
+        return {
+            category_id: self._stats_entry(count, total, first_date, last_date)
+            for category_id, count, total, first_date, last_date in zip(
+                sorted_ids[starts].tolist(), counts.tolist(), totals.tolist(), first.tolist(), last.tolist())
+        }
+
+    @staticmethod
+    def _stats_entry(count, total_amount, first_ordinal, last_ordinal):
+        return {
+            "count": count,
+            "total_amount": round(total_amount, 2),
+            "first_date": date.fromordinal(first_ordinal).isoformat() if first_ordinal else None,
+            "last_date": date.fromordinal(last_ordinal).isoformat() if last_ordinal else None,
+        }
@@ -0,0 +1,89 @@
+"""
+Transaction Update Batch Planner
+
+Many remapped transactions share an identical PUT payload (same new
+category_id and the same resulting label list). The planner groups pending
+updates by payload so each distinct payload is encoded once and the group is
+pushed through the pooled session back-to-back.
+
+The PocketSmith API has no bulk transaction update endpoint, so each
+transaction still needs its own PUT; the batch plan reports how many round
+trips a bulk endpoint would save and how many sequential round-trip "waves"
+remain when requests are pipelined over N concurrent connections.
+"""
+
+import json
+import math
+
+JSON_HEADERS = {"content-type": "application/json"}
+
+
+def payload_key(update_data):
+    """Hashable key identifying an update payload"""
+    labels = update_data.get("labels")
+    return update_data["category_id"], tuple(labels) if labels is not None else None
+
+
+def encode_payload(update_data):
+    return json.dumps(update_data, separators=(',', ':')).encode()
+
+
+def plan_update_batches(updates):
+    """Group prepared updates (see recategorise.prepare_transaction_update) by payload
+
+    Returns a list of batches, largest first, each with the shared payload,
+    its encoded body and the transaction IDs to apply it to.
+    """
+    batches = {}
+    for update in updates:
+        key = payload_key(update["data"])
+        batch = batches.get(key)
+        if batch is None:
+            batch = {"payload": update["data"], "transaction_ids": []}
+            batches[key] = batch
+        batch["transaction_ids"].append(update["transaction_id"])
+
+    planned = sorted(batches.values(), key=lambda b: len(b["transaction_ids"]), reverse=True)
+    for batch in planned:
+        batch["body"] = encode_payload(batch["payload"])
+    return planned
+
+
+def summarize_batch_plan(batches, workers=1):
+    """Round-trip estimates for a batch plan"""
+    total_updates = sum(len(batch["transaction_ids"]) for batch in batches)
+    workers = max(1, workers)
+    return {
+        "total_updates": total_updates,
+        "distinct_payloads": len(batches),
+        "sequential_round_trips": total_updates,
+        "pipelined_round_trip_waves": math.ceil(total_updates / workers),
+        "bulk_endpoint_requests": len(batches),
+        "workers": workers,
+    }
+
+
+def print_batch_plan(batches, workers=1, category_names=None, top=15):
+    """Print a dry-run report of a batch plan"""
+    summary = summarize_batch_plan(batches, workers)
+    category_names = category_names or {}
+
+    print("\n=== BATCH UPDATE PLAN (dry run) ===")
+    print(f"Pending updates: {summary['total_updates']}")
+    print(f"Distinct payloads: {summary['distinct_payloads']}")
+    print(f"Sequential round trips: {summary['sequential_round_trips']}")
+    print(f"Pipelined round-trip waves with {summary['workers']} workers: "
+          f"{summary['pipelined_round_trip_waves']}")
+    print(f"Requests if a bulk endpoint were available: {summary['bulk_endpoint_requests']}")
+
+    if batches:
+        print(f"\nLargest batches:")
+        for batch in batches[:top]:
+            payload = batch["payload"]
+            category = category_names.get(payload["category_id"], payload["category_id"])
+            labels = ", ".join(payload.get("labels") or []) or "-"
+            print(f"  {len(batch['transaction_ids']):>6} x category {category} | labels: {labels}")
+        if len(batches) > top:
+            print(f"  ... and {len(batches) - top} more payloads")
+
+    return summary